@@ -1,35 +1,46 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, g
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-import pickle
 import os
-import json
-from preprocessing import clean_text, get_aspect_sentiment, detect_sarcasm_and_features, assign_three_way_label
+import hmac
+import hashlib
+import time
+from preprocessing import analyze_reviews, combine_sentiment
+from aspect_catalog import load_catalogs, CATALOG_DIR, DEFAULT_DOMAIN
+from model_registry import ModelRegistry
+from result_cache import LRUCache
+from user_store import create_user_store
+from metrics import Metrics, CONTENT_TYPE, format_metric
+from explain import DEFAULT_TOP_K, MAX_TOP_K
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Change this to a random secret key for production
 
+# Per-stage latency histograms and request counters served at /metrics.
+# METRICS_ENABLED=0 turns all instrumentation off.
+metrics = Metrics(enabled=os.environ.get('METRICS_ENABLED', '1') != '0')
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if metrics.enabled and request.endpoint not in (None, 'static', 'metrics_endpoint', 'health_live', 'health_ready') and 'request_start' in g:
+        metrics.observe_request(request.endpoint, response.status_code,
+                                time.perf_counter() - g.request_start)
+    return response
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # User Data Management
-USERS_FILE = 'users.json'
-
-def load_users():
-    if not os.path.exists(USERS_FILE):
-        # Create default admin if file doesn't exist
-        default_users = {'admin': {'password': 'password123'}}
-        save_users(default_users)
-        return default_users
-    try:
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+# 'json' keeps users.json; 'sqlite' stores users in an indexed table (set USERS_FILE to a .db path)
+USER_STORE_BACKEND = os.environ.get('USER_STORE', 'json')
+USERS_FILE = os.environ.get('USERS_FILE', 'users.json')
 
-def save_users(users_data):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users_data, f, indent=4)
+# Users are read once and served from memory; writes are atomic and locked
+user_store = create_user_store(USER_STORE_BACKEND, USERS_FILE)
 
 class User(UserMixin):
     def __init__(self, id):
@@ -37,40 +48,236 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    users = load_users()
-    if user_id not in users:
+    if user_id not in user_store:
         return None
     return User(user_id)
 
 # Load models
 MODEL_DIR = 'models'
-MODEL_PATH = os.path.join(MODEL_DIR, 'sentiment_model.pkl')
-VECTORIZER_PATH = os.path.join(MODEL_DIR, 'tfidf_vectorizer.pkl')
+# Seconds between checks of models/current for a new version; 0 disables the watcher.
+# With several worker processes use the watcher: /admin/reload only reaches one worker.
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', '0'))
+# Lets deploy scripts call /admin/* with an X-Admin-Token header instead of logging in
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Prediction caches. Full responses are keyed on the exact review text because
+# the aspect heuristics look at casing and punctuation; model labels depend only
+# on the clean_text output, so near-duplicates share them. Keys include the
+# model version so a request finishing on an old model cannot poison the cache.
+# Texts are keyed by digest and long reviews are not cached at all, so memory
+# stays bounded by the entry count rather than by what clients send.
+RESULT_CACHE_SIZE = 10000
+RESULT_CACHE_TTL = None  # seconds, None = no expiry
+MAX_CACHED_REVIEW_CHARS = 5000
+response_cache = LRUCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+model_cache = LRUCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+def cache_key(text):
+    """Digest of a review for the prediction caches, None if it is too long to cache."""
+    if len(text) > MAX_CACHED_REVIEW_CHARS:
+        return None
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
 
-model = None
-vectorizer = None
+def clear_prediction_caches(bundle=None):
+    # Cached results belong to the previous model
+    response_cache.clear()
+    model_cache.clear()
+
+# Versioned model slot; handlers read model_registry.active once per request
+model_registry = ModelRegistry(MODEL_DIR, on_swap=clear_prediction_caches)
 
 def load_models():
-    global model, vectorizer
     try:
-        with open(MODEL_PATH, 'rb') as f:
-            model = pickle.load(f)
-        with open(VECTORIZER_PATH, 'rb') as f:
-            vectorizer = pickle.load(f)
-        print("Models loaded successfully.")
+        bundle = model_registry.reload()
+        print(f"Models loaded successfully (version {bundle.version}, {bundle.source}).")
     except Exception as e:
         print(f"Error loading models: {e}")
 
 load_models()
 
+def start_model_watcher():
+    if MODEL_WATCH_INTERVAL > 0:
+        model_registry.start_watcher(MODEL_WATCH_INTERVAL)
+
+def create_app(start_watcher=True):
+    """
+    Entry point for WSGI servers (see wsgi.py and gunicorn.conf.py). Models
+    are loaded when this module is imported; with gunicorn's preload_app that
+    happens once in the master, so the forked workers share the model pages
+    copy-on-write. The model watcher is a thread and threads do not survive
+    fork, so pre-fork servers pass start_watcher=False and start it in each
+    worker instead.
+    """
+    if model_registry.active is None:
+        load_models()
+    if start_watcher:
+        start_model_watcher()
+    return app
+
+# Set as soon as this worker is asked to stop (SIGTERM under gunicorn, see
+# gunicorn.conf.py); /health/ready answers 503 while running requests finish
+shutting_down = False
+
+def begin_shutdown():
+    global shutting_down
+    shutting_down = True
+
+def shutdown():
+    """Called when a worker exits (gunicorn worker_exit hook)."""
+    begin_shutdown()
+    user_store.close()
+
+# Aspect catalogs per product domain (catalogs/*.json), compiled once at startup.
+# Requests pick one with a "domain" field; the default is the built-in lexicon.
+catalogs = load_catalogs(os.environ.get('CATALOG_DIR', CATALOG_DIR))
+print(f"Aspect catalogs: {', '.join(sorted(catalogs))}")
+
+def get_catalog(data):
+    """The AspectCatalog named by a request's "domain" field, or None if unknown."""
+    domain = data.get('domain') or DEFAULT_DOMAIN
+    return catalogs.get(domain) if isinstance(domain, str) else None
+
+def unknown_domain_response():
+    return jsonify({'error': 'Unknown domain', 'domains': sorted(catalogs)}), 400
+
+def parse_explain_top_k(explain, top_k=DEFAULT_TOP_K):
+    """
+    Number of n-grams per class to explain: 0 unless explain is set, else
+    top_k as an int. Returns None for an invalid top_k.
+    """
+    if explain not in (True, 'true', '1', 1):
+        return 0
+    try:
+        top_k = int(top_k)
+    except (TypeError, ValueError):
+        return None
+    return top_k if 0 < top_k <= MAX_TOP_K else None
+
+def get_explain_top_k(data):
+    """
+    parse_explain_top_k for a request: "explain": true (or ?explain=true)
+    turns explanations on and "top_k" overrides the default.
+    """
+    return parse_explain_top_k(data.get('explain', request.args.get('explain', False)),
+                               data.get('top_k', request.args.get('top_k', DEFAULT_TOP_K)))
+
+def explain_error(top_k, bundle):
+    """Error message for a parsed top_k, or None if it can be served."""
+    if top_k is None:
+        return f'top_k must be between 1 and {MAX_TOP_K}'
+    if top_k and bundle.explainer is None:
+        return 'The loaded model does not support explanations'
+    return None
+
+def explain_options(data, bundle):
+    """(top_k, error response or None) for the explain fields of a request."""
+    top_k = get_explain_top_k(data)
+    error = explain_error(top_k, bundle)
+    if error:
+        return 0, (jsonify({'error': error}), 400)
+    return top_k, None
+
 @app.route('/')
 @login_required
 def index():
     return render_template('index.html')
 
+# Largest number of reviews accepted by /predict/batch in one request
+MAX_BATCH_SIZE = 1000
+
+def build_prediction(analysis, model_sentiment):
+    """
+    Combines the model prediction for a review with the heuristic label and
+    aspect sentiments from its ReviewAnalysis into the response fields
+    returned by /predict.
+    """
+    return {
+        'sentiment': combine_sentiment(model_sentiment, analysis.aspect_sentiments),
+        'model_sentiment': model_sentiment,
+        'heuristic_sentiment': analysis.label,
+        'aspects': analysis.aspect_sentiments
+    }
+
+def predict_reviews(texts, bundle, catalog=None, explain_top_k=0):
+    """
+    Runs the prediction pipeline for a list of non-empty reviews with one
+    ModelBundle and one aspect catalog (default domain if None) and returns
+    one /predict response dict per review. Cached reviews skip all work; the
+    rest are vectorized as one sparse matrix and classified with a single
+    model.predict call. With explain_top_k > 0 each result also gets the
+    top n-gram contributions per class, taken from the same matrix.
+    """
+    if catalog is None:
+        catalog = catalogs[DEFAULT_DOMAIN]
+    version = bundle.version
+    domain = catalog.domain
+    keys = [cache_key(text) for text in texts]
+    results = [None if key is None else response_cache.get((version, domain, explain_top_k, key)) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+    
+    # Preprocess and run the aspect heuristics once per review
+    timer = metrics.timer if metrics.enabled else None
+    pending_texts = [texts[i] for i in pending]
+    for text in pending_texts:
+        metrics.observe_review_length(len(text))
+    analyses = dict(zip(pending, analyze_reviews(pending_texts, catalog.aspects, timer=timer, lexicon=catalog.lexicon)))
+    
+    model_sentiments = {}
+    model_keys = {i: cache_key(analyses[i].cleaned_text) for i in pending}
+    to_score = []
+    for i in pending:
+        # Explanations need the tf-idf row, so the model cache is skipped
+        cached = None if explain_top_k or model_keys[i] is None else model_cache.get((version, model_keys[i]))
+        if cached is None:
+            to_score.append(i)
+        else:
+            model_sentiments[i] = cached
+    
+    if to_score:
+        # Vectorize and predict sentiment from model (3-class)
+        with metrics.timer('vectorize'):
+            vec_texts = bundle.vectorizer.transform([analyses[i].cleaned_text for i in to_score])
+        with metrics.timer('predict'):
+            model_sentiments_scored = bundle.model.predict(vec_texts)
+        for i, model_sentiment in zip(to_score, model_sentiments_scored):
+            model_sentiments[i] = model_sentiment
+            if model_keys[i] is not None:
+                model_cache.put((version, model_keys[i]), model_sentiment)
+        if explain_top_k:
+            with metrics.timer('explain'):
+                explanations = dict(zip(to_score, bundle.explainer.explain(vec_texts, explain_top_k)))
+    
+    for i in pending:
+        results[i] = build_prediction(analyses[i], model_sentiments[i])
+        results[i]['model_version'] = version
+        results[i]['domain'] = domain
+        if explain_top_k:
+            results[i]['explanation'] = explanations[i]
+        if keys[i] is not None:
+            response_cache.put((version, domain, explain_top_k, keys[i]), results[i])
+    return results
+
+def predict_batch_results(texts, bundle, catalog=None, explain_top_k=0):
+    """
+    predict_reviews for a list that may hold empty or non-string entries;
+    those get an error field instead of a prediction. Also used by the Unix
+    socket transport (socket_server.py).
+    """
+    # Only non-empty strings go through the model
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text]
+    results = [{'error': 'No text provided'} for _ in texts]
+    
+    if valid:
+        for i, result in zip(valid, predict_reviews([texts[i] for i in valid], bundle, catalog, explain_top_k)):
+            results[i] = result
+    return results
+
 @app.route('/predict', methods=['POST'])
 def predict():
-    if not model or not vectorizer:
+    bundle = model_registry.active
+    if bundle is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
     data = request.get_json()
@@ -79,50 +286,118 @@ def predict():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
     
-    # Preprocess
-    cleaned_text = clean_text(text)
+    catalog = get_catalog(data)
+    if catalog is None:
+        return unknown_domain_response()
+    top_k, error = explain_options(data, bundle)
+    if error:
+        return error
     
-    # Vectorize
-    vec_text = vectorizer.transform([cleaned_text])
-    
-    # Predict Sentiment from model (3-class)
-    model_sentiment = model.predict(vec_text)[0]
-    # If needed, get the heuristic sentiment to compare
-    heuristic_sentiment = assign_three_way_label(text)
-    
-    # Aspect Based Sentiment Analysis
-    aspects = ['battery', 'screen', 'delivery', 'price', 'quality', 'performance', 'camera', 'sound', 'storage']
-    aspect_sentiments = get_aspect_sentiment(text, aspects)
+    return jsonify(predict_reviews([text], bundle, catalog, top_k)[0])
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores a list of reviews in one call: {"texts": [...]} -> {"results": [...]}.
+    An optional "domain" selects the aspect catalog for the whole batch and
+    "explain": true adds per-class n-gram contributions to every result.
+    All reviews are vectorized as one sparse matrix and classified with a
+    single model.predict call. Each result has the same fields as /predict;
+    empty entries get an error field instead.
+    """
+    bundle = model_registry.active
+    if bundle is None:
+        return jsonify({'error': 'Model not loaded'}), 500
     
-    # Smart mixed review detection
-    # Count positive and negative aspects that were mentioned
-    positive_count = sum(1 for sent in aspect_sentiments.values() if sent == 'Positive')
-    negative_count = sum(1 for sent in aspect_sentiments.values() if sent == 'Negative')
-    total_mentioned = positive_count + negative_count
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
     
-    # If we have both positive and negative aspects mentioned
-    # and they're relatively balanced, classify as Neutral (Mixed)
-    final_sentiment = model_sentiment
-    if total_mentioned >= 2:  # At least 2 aspects mentioned
-        if positive_count > 0 and negative_count > 0:
-            # Calculate balance ratio
-            ratio = min(positive_count, negative_count) / max(positive_count, negative_count)
-            # If ratio > 0.4, it's reasonably balanced, so it's mixed
-            if ratio >= 0.4:
-                final_sentiment = 'Neutral'
-            # If one side dominates heavily, use that
-            elif positive_count > negative_count * 2:
-                final_sentiment = 'Positive'
-            elif negative_count > positive_count * 2:
-                final_sentiment = 'Negative'
+    if not isinstance(texts, list) or not texts:
+        return jsonify({'error': 'No texts provided'}), 400
+    if len(texts) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large (max {MAX_BATCH_SIZE} reviews)'}), 400
+    catalog = get_catalog(data)
+    if catalog is None:
+        return unknown_domain_response()
+    top_k, error = explain_options(data, bundle)
+    if error:
+        return error
     
+    return jsonify({'results': predict_batch_results(texts, bundle, catalog, top_k)})
+
+@app.route('/health/live')
+def health_live():
+    """Liveness probe: the worker is up and answering requests."""
+    return jsonify({'status': 'alive', 'pid': os.getpid()})
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness probe: 200 once a model and its vectorizer are loaded, 503 otherwise."""
+    bundle = model_registry.active
+    model_loaded = bundle is not None and bundle.model is not None
+    vectorizer_loaded = bundle is not None and bundle.vectorizer is not None
+    ready = model_loaded and vectorizer_loaded and not shutting_down
     return jsonify({
-        'sentiment': final_sentiment,
-        'model_sentiment': model_sentiment,
-        'heuristic_sentiment': heuristic_sentiment,
-        'aspects': aspect_sentiments
+        'ready': ready,
+        'model_loaded': model_loaded,
+        'vectorizer_loaded': vectorizer_loaded,
+        'model_version': bundle.version if bundle else None,
+        'shutting_down': shutting_down,
+        'pid': os.getpid()
+    }), 200 if ready else 503
+
+@app.route('/domains')
+def list_domains():
+    """Available aspect catalogs and their aspects."""
+    return jsonify({
+        domain: {'aspects': catalog.aspects, 'description': catalog.description}
+        for domain, catalog in sorted(catalogs.items())
+    })
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Hit/miss/eviction counters of the prediction caches."""
+    return jsonify({
+        'responses': response_cache.stats(),
+        'model': model_cache.stats()
     })
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint (404 when METRICS_ENABLED=0)."""
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics disabled'}), 404
+    body = metrics.render()
+    cache_stats = {'responses': response_cache.stats(), 'model': model_cache.stats()}
+    for field in ('hits', 'misses', 'evictions'):
+        body += format_metric(f'sentiment_cache_{field}_total', 'counter', f'Prediction cache {field}.',
+                              [({'cache': name}, stats[field]) for name, stats in cache_stats.items()])
+    return body, 200, {'Content-Type': CONTENT_TYPE}
+
+def is_admin_request():
+    if ADMIN_TOKEN and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return True
+    return current_user.is_authenticated and current_user.id == 'admin'
+
+@app.route('/admin/models')
+def admin_models():
+    """Version of the model serving requests and the state of any reload."""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(model_registry.status())
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Loads and warms the current version in models/ in the background and then
+    swaps it in; requests keep using the loaded model until the swap.
+    """
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    if not model_registry.reload_async():
+        return jsonify({'error': 'Reload already in progress'}), 409
+    return jsonify({'status': 'reloading'}), 202
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -132,9 +407,9 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        users = load_users()
+        user_record = user_store.get(username)
         
-        if username in users and users[username]['password'] == password:
+        if user_record is not None and user_record['password'] == password:
             user = User(username)
             login_user(user)
             return redirect(url_for('index'))
@@ -153,15 +428,14 @@ def register():
         password = request.form['password']
         confirm_password = request.form['confirm_password']
         
-        users = load_users()
-        
-        if username in users:
+        if username in user_store:
             flash('Username already exists')
         elif password != confirm_password:
             flash('Passwords do not match')
+        elif not user_store.add(username, {'password': password}):
+            # Taken by a concurrent registration
+            flash('Username already exists')
         else:
-            users[username] = {'password': password}
-            save_users(users)
             flash('Registration successful! Please login.')
             return redirect(url_for('login'))
             
@@ -174,4 +448,6 @@ def logout():
     return redirect(url_for('login'))
 
 if __name__ == '__main__':
+    # Development server only; use `gunicorn -c gunicorn.conf.py` in production
+    create_app()
     app.run(debug=True)
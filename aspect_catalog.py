@@ -0,0 +1,121 @@
+"""
+Aspect catalogs: per product domain sets of aspects, their synonyms and
+extra sentiment vocabulary. Catalogs are read from catalogs/*.json (or
+*.yaml when PyYAML is installed) and compiled once into an AspectLexicon,
+whose trie matcher is the inverted index from term to aspect. Scoring a
+review walks its text once, so the cost depends on the review length and
+not on how many terms a catalog has.
+
+The built-in 'electronics' catalog is the lexicon in preprocessing.py; a
+file with the same name replaces it.
+"""
+import os
+import json
+from preprocessing import (
+    AspectLexicon, ASPECT_LEXICON, ASPECT_SYNONYMS, POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS,
+    NEGATIVE_PHRASES, INTENSIFIERS
+)
+
+try:
+    import yaml
+except ImportError:  # YAML catalogs are optional
+    yaml = None
+
+CATALOG_DIR = 'catalogs'
+DEFAULT_DOMAIN = 'electronics'
+
+# Lists in a catalog file that extend the shared sentiment lexicons
+EXTRA_LEXICON_KEYS = {
+    'extra_positive_words': POSITIVE_WORDS,
+    'extra_negative_words': NEGATIVE_WORDS,
+    'extra_neutral_words': NEUTRAL_WORDS,
+    'extra_negative_phrases': NEGATIVE_PHRASES,
+    'extra_intensifiers': INTENSIFIERS,
+}
+
+
+class AspectCatalog:
+    """A domain's aspect list and its compiled lexicon."""
+
+    def __init__(self, domain, aspects, lexicon, description=''):
+        self.domain = domain
+        self.aspects = aspects
+        self.lexicon = lexicon
+        self.description = description
+        # Build the term -> aspect index now rather than on the first request
+        lexicon.compile(aspects)
+
+    def analyze(self, text):
+        """Aspect -> sentiment label for every aspect in the catalog."""
+        return self.lexicon.analyze(text, self.aspects)
+
+
+def default_catalog():
+    return AspectCatalog(DEFAULT_DOMAIN, list(ASPECT_SYNONYMS), ASPECT_LEXICON,
+                         'Built-in electronics lexicon')
+
+
+def catalog_from_dict(domain, data):
+    """
+    Builds a catalog from parsed JSON/YAML. Required: 'aspects' mapping each
+    aspect to its terms. Optional: 'phrase_aspect_priority' and the
+    extra_* lists, which are added to the shared lexicons.
+    """
+    aspects = data.get('aspects')
+    if not isinstance(aspects, dict) or not aspects:
+        raise ValueError(f"Catalog '{domain}' needs a non-empty 'aspects' mapping")
+    synonyms = {}
+    for aspect, terms in aspects.items():
+        if not isinstance(terms, list) or not all(isinstance(t, str) and t for t in terms):
+            raise ValueError(f"Catalog '{domain}': terms for '{aspect}' must be a list of non-empty strings")
+        synonyms[aspect] = [t.lower() for t in terms]
+
+    priority = data.get('phrase_aspect_priority', {})
+    for phrase, aspect in priority.items():
+        if aspect not in synonyms:
+            raise ValueError(f"Catalog '{domain}': phrase '{phrase}' points to unknown aspect '{aspect}'")
+
+    lexicons = {}
+    for key, base in EXTRA_LEXICON_KEYS.items():
+        lexicons[key] = set(base) | {w.lower() for w in data.get(key, [])}
+
+    lexicon = AspectLexicon(
+        synonyms, lexicons['extra_positive_words'], lexicons['extra_negative_words'],
+        lexicons['extra_neutral_words'], lexicons['extra_negative_phrases'],
+        {phrase.lower(): aspect for phrase, aspect in priority.items()}, lexicons['extra_intensifiers']
+    )
+    return AspectCatalog(domain, list(synonyms), lexicon, data.get('description', ''))
+
+
+def load_catalog_file(path):
+    domain, ext = os.path.splitext(os.path.basename(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        if ext == '.json':
+            data = json.load(f)
+        else:
+            data = yaml.safe_load(f)
+    return catalog_from_dict(domain, data)
+
+
+def load_catalogs(directory=CATALOG_DIR):
+    """
+    Returns {domain: AspectCatalog} for every catalog file in directory plus
+    the built-in default. Invalid files are reported and skipped.
+    """
+    catalogs = {DEFAULT_DOMAIN: default_catalog()}
+    if not os.path.isdir(directory):
+        return catalogs
+    for name in sorted(os.listdir(directory)):
+        ext = os.path.splitext(name)[1]
+        if ext not in ('.json', '.yaml', '.yml'):
+            continue
+        if ext != '.json' and yaml is None:
+            print(f"Skipping catalog {name}: install PyYAML to load YAML catalogs")
+            continue
+        try:
+            catalog = load_catalog_file(os.path.join(directory, name))
+        except Exception as e:
+            print(f"Error loading catalog {name}: {e}")
+            continue
+        catalogs[catalog.domain] = catalog
+    return catalogs
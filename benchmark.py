@@ -0,0 +1,233 @@
+"""
+Benchmarks for the preprocessing and prediction hot paths.
+
+Reports throughput, latency percentiles and peak memory per function, for
+reviews of controlled length and for different numbers of aspects. Results
+can be saved as a baseline JSON and later runs compared against it; any
+case slower than the baseline by more than --tolerance fails the run.
+
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+import contextlib
+import io
+import pandas as pd
+from preprocessing import (
+    clean_text, get_aspect_sentiment, detect_sarcasm_and_features, assign_three_way_label,
+    ReviewAnalysis, DEFAULT_ASPECTS, ASPECT_SYNONYMS, POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS
+)
+
+DATA_PATH = 'amazon_review_200thousand.csv'
+REVIEW_LENGTHS = [10, 50, 200, 800]  # words per review
+ASPECT_COUNTS = [1, 3, len(DEFAULT_ASPECTS)]
+DEFAULT_SAMPLES = 200
+DEFAULT_TOLERANCE = 0.25
+
+FILLER_WORDS = ['the', 'it', 'is', 'and', 'this', 'phone', 'i', 'was', 'with', 'my', 'for', 'very', 'not', 'but']
+PUNCTUATION = ['', '', '', '', ',', '.', '!']
+
+
+def synthetic_reviews(n, words, seed=0):
+    """Reviews of exactly `words` words built from the lexicons and filler words."""
+    rng = random.Random(seed)
+    vocabulary = sorted(
+        {t for terms in ASPECT_SYNONYMS.values() for t in terms}
+        | POSITIVE_WORDS | NEGATIVE_WORDS | NEUTRAL_WORDS
+    ) + FILLER_WORDS * 5
+    return [
+        ' '.join(rng.choice(vocabulary) + rng.choice(PUNCTUATION) for _ in range(words))
+        for _ in range(n)
+    ]
+
+
+def sampled_reviews(path, n, words, seed=0, pool_size=20000):
+    """
+    Reviews of exactly `words` words taken from the dataset: random reviews
+    are concatenated until long enough and then cut to length.
+    """
+    pool = pd.read_csv(path, header=None, names=['label', 'title', 'review'],
+                       usecols=['review'], nrows=pool_size)['review'].dropna().astype(str).tolist()
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(n):
+        tokens = []
+        while len(tokens) < words:
+            tokens.extend(rng.choice(pool).split())
+        reviews.append(' '.join(tokens[:words]))
+    return reviews
+
+
+def time_calls(fn, inputs, repeat=1):
+    """Latency of every call in nanoseconds."""
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter_ns()
+            fn(item)
+            latencies.append(time.perf_counter_ns() - start)
+    return latencies
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    values = sorted(latencies)
+    total_s = sum(values) / 1e9
+    return {
+        'calls': len(values),
+        'throughput_per_s': len(values) / total_s if total_s else float('inf'),
+        'mean_us': sum(values) / len(values) / 1e3,
+        'p50_us': percentile(values, 50) / 1e3,
+        'p90_us': percentile(values, 90) / 1e3,
+        'p99_us': percentile(values, 99) / 1e3,
+    }
+
+
+def peak_memory_kib(fn, inputs):
+    """Peak traced allocation while running fn over all inputs once."""
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            fn(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def predict_handler():
+    """
+    Returns a function that posts one review to the /predict handler through
+    Flask's test client, or None if no model is available. Result caches
+    are disabled so every call runs the whole pipeline.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    if app.model_registry.active is None:
+        return None
+    app.response_cache.max_size = 0
+    app.model_cache.max_size = 0
+    client = app.app.test_client()
+
+    def call(text):
+        response = client.post('/predict', json={'text': text})
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}")
+
+    return call
+
+
+def build_cases(include_app):
+    """(name, function of (text, aspects)) for every benchmarked function."""
+    cases = [
+        ('clean_text', lambda text, aspects: clean_text(text), False),
+        ('get_aspect_sentiment', get_aspect_sentiment, True),
+        ('detect_sarcasm_and_features', detect_sarcasm_and_features, True),
+        ('assign_three_way_label', assign_three_way_label, True),
+        ('ReviewAnalysis', ReviewAnalysis, True),
+    ]
+    if include_app:
+        handler = predict_handler()
+        if handler is None:
+            print("No model in models/, skipping the /predict handler")
+        else:
+            cases.append(('predict_handler', lambda text, aspects: handler(text), False))
+    return cases
+
+
+def run_benchmarks(reviews_by_length, include_app=True, repeat=1, memory=True):
+    results = {}
+    for name, fn, uses_aspects in build_cases(include_app):
+        aspect_counts = ASPECT_COUNTS if uses_aspects else [len(DEFAULT_ASPECTS)]
+        for words, reviews in reviews_by_length.items():
+            for n_aspects in aspect_counts:
+                aspects = DEFAULT_ASPECTS[:n_aspects]
+                call = lambda text: fn(text, aspects)
+                call(reviews[0])  # warm up
+                stats = summarize(time_calls(call, reviews, repeat))
+                if memory:
+                    stats['peak_kib'] = peak_memory_kib(call, reviews)
+                key = f"{name}[words={words},aspects={n_aspects}]"
+                results[key] = stats
+                print(f"{key:<58} {stats['throughput_per_s']:>10.0f}/s  p50 {stats['p50_us']:>9.1f}us  "
+                      f"p90 {stats['p90_us']:>9.1f}us  p99 {stats['p99_us']:>9.1f}us"
+                      + (f"  peak {stats['peak_kib']:>8.1f}KiB" if memory else ''))
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns the cases whose p50 latency regressed by more than tolerance."""
+    regressions = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None:
+            continue
+        ratio = current['p50_us'] / base['p50_us'] if base['p50_us'] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append((key, base['p50_us'], current['p50_us'], ratio))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing and prediction hot paths.")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV to sample reviews from")
+    parser.add_argument('--synthetic', action='store_true', help="use generated reviews even if the CSV exists")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help="reviews per length bucket")
+    parser.add_argument('--lengths', type=int, nargs='+', default=REVIEW_LENGTHS, help="review lengths in words")
+    parser.add_argument('--repeat', type=int, default=1, help="passes over the samples per case")
+    parser.add_argument('--skip-app', action='store_true', help="do not benchmark the /predict handler")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--save-baseline', help="write results as the baseline JSON")
+    parser.add_argument('--baseline', help="baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p50 slowdown vs the baseline (0.25 = 25%%)")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    use_csv = not args.synthetic and os.path.exists(args.data)
+    print(f"Reviews: {'sampled from ' + args.data if use_csv else 'synthetic'}, "
+          f"{args.samples} per length {args.lengths}")
+    reviews_by_length = {}
+    for words in args.lengths:
+        if use_csv:
+            reviews_by_length[words] = sampled_reviews(args.data, args.samples, words, args.seed)
+        else:
+            reviews_by_length[words] = synthetic_reviews(args.samples, words, args.seed)
+
+    results = run_benchmarks(reviews_by_length, include_app=not args.skip_app,
+                             repeat=args.repeat, memory=not args.no_memory)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=4, sort_keys=True)
+            print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS (p50 more than {args.tolerance:.0%} slower than baseline):")
+            for key, before, after, ratio in regressions:
+                print(f"  {key}: {before:.1f}us -> {after:.1f}us ({ratio:.2f}x)")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
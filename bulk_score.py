@@ -0,0 +1,286 @@
+"""
+Offline bulk scoring of review files with the trained model.
+
+Reads a CSV or JSONL file in bounded-memory chunks, runs the aspect
+heuristics across a process pool, scores each chunk with one vectorized
+transform/predict call and streams the results to a CSV or JSONL file.
+Progress is checkpointed after every chunk, so a killed job continues
+where it stopped when run again with the same arguments. A checkpoint is
+only resumed for the same input file and the same arguments that shape the
+output (text column, formats, domain, --explain); if the output was removed
+or truncated since, scoring starts over.
+
+    python bulk_score.py reviews.csv scored.jsonl --workers 0
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from preprocessing import analyze_reviews, combine_sentiment
+from model_registry import load_current_bundle
+from aspect_catalog import load_catalogs, CATALOG_DIR, DEFAULT_DOMAIN
+
+MODEL_DIR = 'models'
+DEFAULT_CHUNK_ROWS = 10000
+DEFAULT_WORKERS = 1
+# Reviews per task sent to a worker process
+POOL_TASK_SIZE = 1000
+# Column names for headerless CSVs such as amazon_review_200thousand.csv
+DEFAULT_CSV_NAMES = 'label,title,review'
+RESULT_COLUMNS = ['sentiment', 'model_sentiment', 'heuristic_sentiment', 'aspects', 'model_version']
+
+
+# Aspect catalog used by analyze_texts; set in each worker by use_catalog
+_catalog = None
+
+
+def use_catalog(catalog_dir, domain):
+    global _catalog
+    _catalog = load_catalogs(catalog_dir)[domain] if domain != DEFAULT_DOMAIN else None
+
+
+def analyze_texts(texts):
+    """
+    Cleaned text, heuristic label and aspect sentiments for a list of reviews.
+    Module-level so it can run in worker processes; missing texts give None.
+    """
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text]
+    results = [None] * len(texts)
+    if _catalog is None:
+        analyses = analyze_reviews([texts[i] for i in valid])
+    else:
+        analyses = analyze_reviews([texts[i] for i in valid], _catalog.aspects, lexicon=_catalog.lexicon)
+    for i, analysis in zip(valid, analyses):
+        results[i] = (analysis.cleaned_text, analysis.label, analysis.aspect_sentiments)
+    return results
+
+
+def file_format(path, override=None):
+    if override:
+        return override
+    return 'jsonl' if path.endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+
+
+def read_chunks(path, fmt, chunk_rows, header, names):
+    """Yields DataFrames of at most chunk_rows input rows."""
+    if fmt == 'jsonl':
+        return pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False)
+    if header:
+        return pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+    return pd.read_csv(path, header=None, names=names, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+
+def score_chunk(df, text_column, bundle, executor, explain_top_k=0):
+    """
+    Adds the RESULT_COLUMNS to a chunk of input rows, plus an 'explanation'
+    column of per-class top n-grams when explain_top_k > 0.
+    """
+    texts = df[text_column].tolist()
+    if executor is not None:
+        tasks = [texts[i:i + POOL_TASK_SIZE] for i in range(0, len(texts), POOL_TASK_SIZE)]
+        analyses = [a for part in executor.map(analyze_texts, tasks) for a in part]
+    else:
+        analyses = analyze_texts(texts)
+
+    scored = [i for i, a in enumerate(analyses) if a is not None]
+    model_sentiments = {}
+    explanations = {}
+    if scored:
+        # One sparse matrix and one predict call for the whole chunk
+        X = bundle.vectorizer.transform([analyses[i][0] for i in scored])
+        model_sentiments = dict(zip(scored, bundle.model.predict(X)))
+        if explain_top_k:
+            explanations = dict(zip(scored, bundle.explainer.explain(X, explain_top_k)))
+
+    names = RESULT_COLUMNS + ['explanation'] if explain_top_k else RESULT_COLUMNS
+    columns = {name: [] for name in names}
+    for i, analysis in enumerate(analyses):
+        if analysis is None:
+            for name in names:
+                columns[name].append(None)
+            continue
+        _, label, aspect_sentiments = analysis
+        model_sentiment = str(model_sentiments[i])
+        columns['sentiment'].append(combine_sentiment(model_sentiment, aspect_sentiments))
+        columns['model_sentiment'].append(model_sentiment)
+        columns['heuristic_sentiment'].append(label)
+        columns['aspects'].append(aspect_sentiments)
+        columns['model_version'].append(bundle.version)
+        if explain_top_k:
+            columns['explanation'].append(explanations[i])
+
+    out = df.copy()
+    for name, values in columns.items():
+        out[name] = values
+    return out
+
+
+def write_chunk(f, df, fmt, write_header):
+    if fmt == 'jsonl':
+        # lines=True output already ends with a newline
+        f.write(df.to_json(orient='records', lines=True, force_ascii=False))
+    else:
+        df = df.copy()
+        for name in ('aspects', 'explanation'):
+            if name in df.columns:
+                df[name] = [json.dumps(a) if a is not None else '' for a in df[name]]
+        df.to_csv(f, header=write_header, index=False)
+
+
+def load_progress(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_progress(path, state):
+    """Atomic checkpoint: written to a temp file and renamed over the old one."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def run_settings(input_path, text_column, in_fmt, out_fmt, header, names, domain, explain_top_k):
+    """Arguments that decide which rows are read and the output schema; a run resumes only with the same ones."""
+    return {
+        'input': os.path.abspath(input_path),
+        'text_column': text_column,
+        'input_format': in_fmt,
+        'output_format': out_fmt,
+        'header': header,
+        'names': names,
+        'domain': domain,
+        'explain_top_k': explain_top_k,
+    }
+
+
+def bulk_score(input_path, output_path, text_column='review', chunk_rows=DEFAULT_CHUNK_ROWS,
+               workers=DEFAULT_WORKERS, input_format=None, output_format=None, header=False,
+               names=DEFAULT_CSV_NAMES, model_dir=MODEL_DIR, restart=False,
+               domain=DEFAULT_DOMAIN, catalog_dir=CATALOG_DIR, explain_top_k=0):
+    in_fmt = file_format(input_path, input_format)
+    out_fmt = file_format(output_path, output_format)
+    progress_path = output_path + '.progress'
+
+    bundle = load_current_bundle(model_dir)
+    print(f"Loaded model version {bundle.version} ({bundle.source})")
+    if explain_top_k and bundle.explainer is None:
+        raise ValueError(f"The model in {model_dir} has no vocabulary, so --explain is not available")
+    if domain not in load_catalogs(catalog_dir):
+        raise ValueError(f"Unknown domain '{domain}' (no catalog in {catalog_dir})")
+    use_catalog(catalog_dir, domain)
+
+    settings = run_settings(input_path, text_column, in_fmt, out_fmt, header, names, domain, explain_top_k)
+    state = None if restart else load_progress(progress_path)
+    if state and state.get('input') != settings['input']:
+        raise ValueError(f"{progress_path} belongs to a run on {state.get('input')}, not {input_path}; "
+                         f"use --restart to score {input_path} into {output_path} from the start")
+    if state and state.get('settings') != settings:
+        # Appending rows with other columns would corrupt the output (a CSV keeps its first header)
+        changed = sorted(k for k in settings if (state.get('settings') or {}).get(k) != settings[k])
+        raise ValueError(f"{progress_path} was written with different {', '.join(changed)}; "
+                         f"rerun with the same arguments or use --restart")
+    if state and state.get('complete'):
+        print(f"{output_path} is already complete ({state['rows_done']} rows); use --restart to redo it")
+        return
+    if state and (not os.path.exists(output_path) or os.path.getsize(output_path) < state['output_bytes']):
+        print(f"{output_path} is missing or shorter than at the last checkpoint; starting over")
+        state = None
+    if state:
+        if state.get('model_version') != bundle.version:
+            print(f"Warning: resuming with model {bundle.version}, earlier rows used {state.get('model_version')}")
+        print(f"Resuming after {state['rows_done']} rows")
+        rows_done = state['rows_done']
+        # Drop anything written after the last checkpoint
+        with open(output_path, 'r+b') as f:
+            f.truncate(state['output_bytes'])
+    else:
+        rows_done = 0
+        open(output_path, 'w').close()
+
+    if not workers:
+        workers = os.cpu_count() or 1
+    executor = None
+    if workers > 1:
+        # Each worker compiles the catalog once
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=use_catalog,
+                                       initargs=(catalog_dir, domain))
+    start = time.perf_counter()
+    scored_now = 0
+    rows_seen = 0
+    try:
+        with open(output_path, 'a', encoding='utf-8', newline='') as out:
+            for chunk in read_chunks(input_path, in_fmt, chunk_rows, header, names.split(',')):
+                # Skip rows finished by an earlier run
+                if rows_seen + len(chunk) <= rows_done:
+                    rows_seen += len(chunk)
+                    continue
+                if rows_seen < rows_done:
+                    chunk = chunk.iloc[rows_done - rows_seen:]
+                    rows_seen = rows_done
+                if text_column not in chunk.columns:
+                    raise ValueError(f"Column '{text_column}' not found in input (columns: {list(chunk.columns)})")
+
+                result = score_chunk(chunk, text_column, bundle, executor, explain_top_k)
+                write_chunk(out, result, out_fmt, write_header=(rows_seen == 0))
+                out.flush()
+                os.fsync(out.fileno())
+
+                rows_seen += len(chunk)
+                scored_now += len(chunk)
+                save_progress(progress_path, {
+                    'input': settings['input'],
+                    'settings': settings,
+                    'rows_done': rows_seen,
+                    'output_bytes': os.fstat(out.fileno()).st_size,
+                    'model_version': bundle.version,
+                    'complete': False,
+                })
+                elapsed = time.perf_counter() - start
+                print(f"Scored {rows_seen} rows ({scored_now / elapsed:.0f} rows/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    state = load_progress(progress_path) or {'input': settings['input'], 'settings': settings, 'rows_done': rows_seen,
+                                             'output_bytes': os.path.getsize(output_path)}
+    state['complete'] = True
+    state['model_version'] = bundle.version
+    save_progress(progress_path, state)
+    print(f"Done: {rows_seen} rows written to {output_path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score a CSV/JSONL file of reviews with the trained model.")
+    parser.add_argument('input', help="input .csv or .jsonl file")
+    parser.add_argument('output', help="output .csv or .jsonl file (a .progress file is kept next to it)")
+    parser.add_argument('--text-column', default='review', help="column/field holding the review text")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="input rows per chunk")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="processes for the aspect heuristics (0 = all cores)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    parser.add_argument('--header', action='store_true', help="the input CSV has a header row")
+    parser.add_argument('--names', default=DEFAULT_CSV_NAMES,
+                        help="comma-separated column names for a headerless CSV")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--domain', default=DEFAULT_DOMAIN, help="aspect catalog to score with")
+    parser.add_argument('--catalog-dir', default=CATALOG_DIR)
+    parser.add_argument('--explain', type=int, default=0, metavar='K',
+                        help="add the top K contributing n-grams per class to each row")
+    parser.add_argument('--restart', action='store_true', help="ignore saved progress and start over")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    bulk_score(args.input, args.output, text_column=args.text_column, chunk_rows=args.chunk_rows,
+               workers=args.workers, input_format=args.input_format, output_format=args.output_format,
+               header=args.header, names=args.names, model_dir=args.model_dir, restart=args.restart,
+               domain=args.domain, catalog_dir=args.catalog_dir, explain_top_k=args.explain)
@@ -0,0 +1,269 @@
+import os
+import json
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Vectorizer settings that decide how text is split into n-grams. They are
+# stored in meta.json so the exact same analyzer can be rebuilt at load time.
+ANALYZER_PARAMS = [
+    'input', 'encoding', 'decode_error', 'strip_accents', 'lowercase',
+    'analyzer', 'stop_words', 'token_pattern', 'ngram_range'
+]
+
+META_FILE = 'meta.json'
+VOCAB_FILE = 'vocabulary.npy'
+IDF_FILE = 'idf.npy'
+COEF_FILE = 'coef.npy'
+COEF_SCALE_FILE = 'coef_scale.npy'
+INTERCEPT_FILE = 'intercept.npy'
+
+# Weight formats for export_compact_model(quantize=...). Quantized exports
+# also replace the string vocabulary with 64-bit n-gram hashes.
+QUANTIZE_DTYPES = ('float16', 'int8')
+
+# FNV-1a over the UTF-32 code points of an n-gram
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME = np.uint64(1099511628211)
+
+
+def hash_ngrams(ngrams):
+    """
+    64-bit FNV-1a hash of every string in ngrams, computed column by column
+    over a fixed-width UTF-32 array so the work stays in numpy. Padding is
+    skipped, so a hash does not depend on the other strings in the batch
+    (n-grams never contain NUL).
+    """
+    ngrams = np.asarray(ngrams)
+    if ngrams.dtype.kind != 'U':
+        ngrams = ngrams.astype(str)
+    hashes = np.full(len(ngrams), FNV_OFFSET, dtype=np.uint64)
+    if not len(ngrams) or ngrams.dtype.itemsize == 0:
+        return hashes
+    codes = ngrams.view(np.uint32).reshape(len(ngrams), -1)
+    for column in codes.T:
+        present = column != 0
+        mixed = (hashes ^ column.astype(np.uint64)) * FNV_PRIME
+        hashes = np.where(present, mixed, hashes)
+    return hashes
+
+
+def export_compact_model(model, vectorizer, directory, quantize=None):
+    """
+    Writes a fitted TfidfVectorizer + linear classifier as plain numpy arrays:
+    the vocabulary as a sorted string array, idf, coef_ and intercept_, plus
+    a small meta.json. Unlike the pickles these load with np.load(mmap_mode='r'),
+    so workers share the pages through the OS page cache.
+
+    quantize='float16' or 'int8' writes a smaller artifact: coef_ in that
+    type (int8 with one scale per class), idf as float32 and the vocabulary
+    as sorted 64-bit n-gram hashes instead of strings.
+    """
+    if quantize not in (None,) + QUANTIZE_DTYPES:
+        raise ValueError(f"quantize must be one of {QUANTIZE_DTYPES}, got {quantize!r}")
+    if not hasattr(vectorizer, 'vocabulary_'):
+        raise ValueError("Compact export needs a vectorizer with a fitted vocabulary")
+    params = vectorizer.get_params()
+    if params['tokenizer'] is not None or params['preprocessor'] is not None or callable(params['analyzer']):
+        raise ValueError("Compact export does not support custom tokenizers/preprocessors/analyzers")
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # Sort terms (or their hashes) so lookups can use np.searchsorted, and reorder the weights to match
+    terms = np.array(sorted(vectorizer.vocabulary_))
+    if quantize:
+        keys = hash_ngrams(terms)
+        if len(np.unique(keys)) != len(keys):
+            raise ValueError("Two vocabulary n-grams share a hash; export without quantize")
+        by_key = np.argsort(keys)
+        keys = keys[by_key]
+        terms = terms[by_key]
+    else:
+        keys = terms
+    order = np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int64)
+    coef = np.asarray(model.coef_, dtype=np.float64)[:, order]
+
+    for name in (VOCAB_FILE, IDF_FILE, COEF_FILE, COEF_SCALE_FILE, INTERCEPT_FILE):
+        # Drop files of an earlier export in another format
+        if os.path.exists(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+    np.save(os.path.join(directory, VOCAB_FILE), keys)
+    if params['use_idf']:
+        idf_dtype = np.float32 if quantize else np.float64
+        np.save(os.path.join(directory, IDF_FILE), np.asarray(vectorizer.idf_, dtype=idf_dtype)[order])
+    if quantize == 'int8':
+        # Symmetric per-class scale: the largest weight of each class maps to 127
+        scale = np.abs(coef).max(axis=1) / 127
+        scale[scale == 0] = 1
+        np.save(os.path.join(directory, COEF_FILE), np.round(coef / scale[:, None]).astype(np.int8))
+        np.save(os.path.join(directory, COEF_SCALE_FILE), scale)
+    elif quantize == 'float16':
+        np.save(os.path.join(directory, COEF_FILE), coef.astype(np.float16))
+    else:
+        np.save(os.path.join(directory, COEF_FILE), np.ascontiguousarray(coef))
+    np.save(os.path.join(directory, INTERCEPT_FILE), np.asarray(model.intercept_, dtype=np.float64))
+
+    meta = {
+        'analyzer': {name: params[name] for name in ANALYZER_PARAMS},
+        'binary': params['binary'],
+        'norm': params['norm'],
+        'use_idf': params['use_idf'],
+        'sublinear_tf': params['sublinear_tf'],
+        'classes': [str(c) for c in model.classes_],
+        'vocabulary': 'hashed' if quantize else 'strings',
+        # Longer tokens cannot be in the vocabulary and are skipped before hashing
+        'max_ngram_length': max((len(t) for t in terms), default=0),
+        'coef_dtype': quantize or 'float64',
+    }
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=4)
+
+
+def load_compact_model(directory):
+    """Loads an exported model. Returns (model, vectorizer) like the pickles."""
+    with open(os.path.join(directory, META_FILE), 'r') as f:
+        meta = json.load(f)
+    vectorizer = CompactVectorizer(directory, meta)
+    model = CompactLinearModel(directory, meta)
+    return model, vectorizer
+
+
+class CompactVectorizer:
+    """
+    numpy implementation of TfidfVectorizer.transform over a memory-mapped,
+    sorted vocabulary. Produces the same CSR matrix as the sklearn object.
+    With a hashed vocabulary n-grams are looked up by their 64-bit hash, and
+    get_feature_names_out is not available.
+    """
+
+    def __init__(self, directory, meta):
+        analyzer_params = dict(meta['analyzer'])
+        analyzer_params['ngram_range'] = tuple(analyzer_params['ngram_range'])
+        # Only the analyzer is used; building it from the saved params keeps tokenization identical
+        self._analyze = TfidfVectorizer(**analyzer_params).build_analyzer()
+        self.vocabulary = np.load(os.path.join(directory, VOCAB_FILE), mmap_mode='r')
+        self.hashed = meta.get('vocabulary', 'strings') == 'hashed'
+        # Longest vocabulary n-gram; longer tokens cannot match. Hashed
+        # exports made before it was stored in meta.json have no limit
+        if self.hashed:
+            self.max_ngram_length = meta.get('max_ngram_length')
+        else:
+            self.max_ngram_length = self.vocabulary.dtype.itemsize // 4
+        self.idf = np.load(os.path.join(directory, IDF_FILE), mmap_mode='r') if meta['use_idf'] else None
+        self.binary = meta['binary']
+        self.norm = meta['norm']
+        self.sublinear_tf = meta['sublinear_tf']
+
+    def get_feature_names_out(self):
+        if self.hashed:
+            raise AttributeError("A hashed vocabulary has no feature names")
+        return np.asarray(self.vocabulary, dtype=object)
+
+    def transform(self, raw_documents):
+        """Returns the tf-idf CSR matrix for a list of documents."""
+        raw_documents = list(raw_documents)
+        n_features = len(self.vocabulary)
+        tokens = []
+        rows = []
+        for i, doc in enumerate(raw_documents):
+            doc_tokens = self._analyze(doc)
+            if self.max_ngram_length is not None:
+                # Dropped before the fixed-width array below is built (and
+                # hashed one character column at a time), whose width would
+                # otherwise be set by a single huge token
+                doc_tokens = [t for t in doc_tokens if len(t) <= self.max_ngram_length]
+            tokens.extend(doc_tokens)
+            rows.extend([i] * len(doc_tokens))
+
+        if tokens:
+            # One vectorized lookup for every n-gram in the batch
+            tokens = np.array(tokens)
+            if self.hashed:
+                tokens = hash_ngrams(tokens)
+            pos = np.searchsorted(self.vocabulary, tokens)
+            pos_clipped = np.minimum(pos, n_features - 1)
+            known = (pos < n_features) & (self.vocabulary[pos_clipped] == tokens)
+            rows = np.asarray(rows, dtype=np.int64)[known]
+            cols = pos[known]
+        else:
+            rows = np.zeros(0, dtype=np.int64)
+            cols = np.zeros(0, dtype=np.int64)
+
+        X = sp.csr_matrix((np.ones(len(cols), dtype=np.float64), (rows, cols)),
+                          shape=(len(raw_documents), n_features))
+        X.sum_duplicates()
+        X.sort_indices()
+
+        if self.binary:
+            X.data.fill(1)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.norm:
+            _normalize_rows(X, self.norm)
+        return X
+
+
+class CompactLinearModel:
+    """
+    Linear classifier over memory-mapped coef_/intercept_ with sklearn's
+    predict rules. Quantized weights are kept as stored (weights + scale,
+    no coef_) and scored straight from the sparse rows, so they are never
+    expanded to a float64 matrix.
+    """
+
+    def __init__(self, directory, meta):
+        self.coef_dtype = meta.get('coef_dtype', 'float64')
+        coef = np.load(os.path.join(directory, COEF_FILE), mmap_mode='r')
+        if self.coef_dtype == 'float64':
+            self.coef_ = coef
+        else:
+            self.weights = coef
+            self.scale = np.load(os.path.join(directory, COEF_SCALE_FILE)) if self.coef_dtype == 'int8' else None
+        self.intercept_ = np.load(os.path.join(directory, INTERCEPT_FILE), mmap_mode='r')
+        self.classes_ = np.array(meta['classes'])
+
+    def decision_function(self, X):
+        if self.coef_dtype == 'float64':
+            scores = np.asarray(X @ self.coef_.T)
+        else:
+            scores = _sparse_scores(X, self.weights)
+            if self.scale is not None:
+                scores *= self.scale
+        scores = scores + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+
+def _sparse_scores(X, weights):
+    """X @ weights.T from the nonzeros of CSR X; only the used columns are upcast."""
+    X = X.tocsr()
+    n_rows = X.shape[0]
+    row_ids = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+    scores = np.empty((n_rows, weights.shape[0]))
+    for c in range(weights.shape[0]):
+        products = X.data * weights[c, X.indices]
+        scores[:, c] = np.bincount(row_ids, weights=products, minlength=n_rows)
+    return scores
+
+
+def _normalize_rows(X, norm):
+    """In-place row normalization of a CSR matrix, as sklearn.preprocessing.normalize."""
+    counts = np.diff(X.indptr)
+    row_ids = np.repeat(np.arange(X.shape[0]), counts)
+    if norm == 'l2':
+        norms = np.sqrt(np.bincount(row_ids, weights=X.data ** 2, minlength=X.shape[0]))
+    elif norm == 'l1':
+        norms = np.bincount(row_ids, weights=np.abs(X.data), minlength=X.shape[0])
+    else:
+        raise ValueError(f"Unsupported norm: {norm}")
+    norms[norms == 0] = 1
+    X.data /= np.repeat(norms, counts)
@@ -0,0 +1,84 @@
+"""
+Per-review explanations for the linear sentiment model.
+
+For a linear model the decision score of a class is intercept + sum(x_j * w_j)
+over the nonzero tf-idf values x_j of the review, so each n-gram's
+contribution is exactly x_j * w_j. Contributions are computed for the whole
+batch at once from the CSR matrix the prediction already produced, and the
+top-k n-grams per class are picked with one sort.
+"""
+import numpy as np
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 50
+
+
+class LinearExplainer:
+    """
+    Top-k n-gram contributions per class for a model with coef_/classes_
+    and a vectorizer with a vocabulary. The column -> n-gram table is built
+    once when the explainer is created.
+    """
+
+    def __init__(self, model, vectorizer):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        self.classes = [str(c) for c in model.classes_]
+        if coef.shape[0] == 1:
+            # Binary models keep one weight row for classes_[1]; classes_[0] gets its negation
+            coef = np.vstack([-coef[0], coef[0]])
+        # Column-major so the per-class weights of a column are contiguous
+        self.coef_by_feature = np.ascontiguousarray(coef.T)
+        self.feature_names = np.asarray(vectorizer.get_feature_names_out(), dtype=object)
+
+    def explain(self, X, top_k=DEFAULT_TOP_K):
+        """
+        Returns one {class: [{'ngram', 'contribution'}, ...]} dict per row of
+        the CSR matrix X, listing up to top_k n-grams that pushed the review
+        towards each class, largest contribution first.
+        """
+        X = X.tocsr()
+        n_rows = X.shape[0]
+        nnz = len(X.data)
+        n_classes = len(self.classes)
+        row_ids = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+        # Class-major (n_classes * nnz): tf-idf value times the weight of its column for each class
+        values = (X.data[:, None] * self.coef_by_feature[X.indices]).T.ravel()
+        groups = np.arange(n_classes).repeat(nnz) * n_rows + np.tile(row_ids, n_classes)
+        columns = np.tile(X.indices, n_classes)
+
+        # Only n-grams that push towards a class can explain it
+        positive = values > 0
+        values, groups, columns = values[positive], groups[positive], columns[positive]
+        # Group g = class * n_rows + row; contribution descending within each group.
+        # Both sorts are stable, and the one on integer groups is a radix sort
+        order = np.argsort(-values, kind='stable')
+        order = order[np.argsort(groups[order], kind='stable')]
+        sorted_groups = groups[order]
+        starts = np.searchsorted(sorted_groups, sorted_groups)
+        keep = order[np.arange(len(order)) - starts < top_k]
+
+        bounds = np.searchsorted(groups[keep], np.arange(n_classes * n_rows + 1)).tolist()
+        ngrams = self.feature_names[columns[keep]].tolist()
+        contributions = np.round(values[keep], 6).tolist()
+
+        explanations = []
+        for row in range(n_rows):
+            explanation = {}
+            for c, label in enumerate(self.classes):
+                lo, hi = bounds[c * n_rows + row], bounds[c * n_rows + row + 1]
+                explanation[label] = [
+                    {'ngram': ngram, 'contribution': value}
+                    for ngram, value in zip(ngrams[lo:hi], contributions[lo:hi])
+                ]
+            explanations.append(explanation)
+        return explanations
+
+
+def make_explainer(model, vectorizer):
+    """LinearExplainer for the model, or None if it cannot be explained (e.g. hashed features)."""
+    if not hasattr(model, 'coef_') or not hasattr(vectorizer, 'get_feature_names_out'):
+        return None
+    try:
+        return LinearExplainer(model, vectorizer)
+    except (AttributeError, ValueError):
+        return None
@@ -0,0 +1,81 @@
+"""
+gunicorn settings for serving the app in production.
+
+The app is imported in the master before the workers are forked
+(preload_app), so models/ is read once and every worker shares the same
+pages copy-on-write. Settings can be overridden with the environment
+variables below or on the gunicorn command line. With SOCKET_PATH set the
+workers also serve the Unix socket transport from socket_server.py.
+"""
+import os
+import signal
+import multiprocessing
+
+wsgi_app = 'wsgi:application'
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Requests are CPU bound, so one thread per process
+worker_class = 'sync'
+preload_app = True
+
+# Requests still running after SIGTERM get graceful_timeout seconds to finish
+timeout = int(os.environ.get('WORKER_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = int(os.environ.get('MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('ACCESS_LOG')
+errorlog = '-'
+
+# Optional Unix socket transport (socket_server.py). The master binds it
+# once, like the HTTP port, and every worker accepts connections on it
+socket_path = os.environ.get('SOCKET_PATH')
+socket_listener = None
+socket_server = None
+
+
+def on_starting(server):
+    global socket_listener
+    if socket_path:
+        from socket_server import bind_socket
+        socket_listener = bind_socket(socket_path)
+        server.log.info("Serving predictions on unix:%s", socket_path)
+
+
+def post_fork(server, worker):
+    global socket_server
+    import app
+    app.start_model_watcher()
+    if socket_listener is not None:
+        from socket_server import start_socket_server
+        socket_server = start_socket_server(listener=socket_listener)
+
+
+def post_worker_init(worker):
+    # gunicorn's SIGTERM handler only stops the worker loop once the running
+    # request is done; mark the app as shutting down right away so
+    # /health/ready answers 503 during the graceful shutdown
+    import app
+    graceful_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        app.begin_shutdown()
+        graceful_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    import app
+    if socket_server is not None:
+        socket_server.shutdown()
+    app.shutdown()
+
+
+def on_exit(server):
+    if socket_listener is not None:
+        socket_listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,161 @@
+"""
+Load test for the /predict endpoint.
+
+Runs client processes against a running instance, or starts gunicorn
+(gunicorn.conf.py) once per worker count and reports how throughput scales:
+
+    python load_test.py --url http://127.0.0.1:8000 --duration 10 --concurrency 8
+    python load_test.py --spawn-workers 1 2 4 --duration 10
+
+Each client keeps one HTTP connection and posts distinct synthetic reviews,
+so the per-worker result caches see few repeats. The clients need CPU too:
+run them on another machine to measure a server with few cores.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ProcessPoolExecutor
+from benchmark import synthetic_reviews, percentile
+
+DEFAULT_URL = 'http://127.0.0.1:8000'
+DEFAULT_DURATION = 10
+DEFAULT_CONCURRENCY = 8
+DEFAULT_WORDS = 50
+READY_TIMEOUT = 120
+BASE_PORT = 8500
+
+
+def run_client(url, texts, duration):
+    """One client: posts texts in a loop for duration seconds. Returns (latencies_ns, errors)."""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({'text': texts[i % len(texts)]})
+        i += 1
+        start = time.perf_counter_ns()
+        try:
+            conn.request('POST', '/predict', body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            continue
+        latencies.append(time.perf_counter_ns() - start)
+    conn.close()
+    return latencies, errors
+
+
+def load_test(url, duration=DEFAULT_DURATION, concurrency=DEFAULT_CONCURRENCY, words=DEFAULT_WORDS):
+    """Runs concurrency client processes against url and returns summary stats."""
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(run_client, url, synthetic_reviews(500, words, seed=client), duration)
+            for client in range(concurrency)
+        ]
+        results = [f.result() for f in futures]
+
+    latencies = sorted(l for client_latencies, _ in results for l in client_latencies)
+    errors = sum(e for _, e in results)
+    if not latencies:
+        return {'requests': 0, 'errors': errors, 'throughput_per_s': 0.0,
+                'p50_ms': None, 'p90_ms': None, 'p99_ms': None}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_per_s': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) / 1e6,
+        'p90_ms': percentile(latencies, 90) / 1e6,
+        'p99_ms': percentile(latencies, 99) / 1e6,
+    }
+
+
+def wait_until_ready(url, process, timeout=READY_TIMEOUT):
+    parts = urlsplit(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request('GET', '/health/ready')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} was not ready after {timeout}s")
+
+
+def spawn_and_test(worker_counts, duration, concurrency, words):
+    """Starts gunicorn once per worker count, load tests it and stops it gracefully."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for i, workers in enumerate(worker_counts):
+        port = BASE_PORT + i
+        url = f'http://127.0.0.1:{port}'
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                   '--workers', str(workers), '--bind', f'127.0.0.1:{port}']
+        process = subprocess.Popen(command, cwd=here)
+        try:
+            wait_until_ready(url, process)
+            print(f"Testing {workers} worker(s) on {url} for {duration}s with {concurrency} clients...")
+            stats = load_test(url, duration, concurrency, words)
+        finally:
+            # SIGTERM = graceful shutdown: in-flight requests finish first
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+        stats['workers'] = workers
+        rows.append(stats)
+    return rows
+
+
+def print_table(rows):
+    base = rows[0]['throughput_per_s'] or 1
+    print(f"\n{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for row in rows:
+        print(f"{row.get('workers', '-'):>7} {row['throughput_per_s']:>9.1f} {row['throughput_per_s'] / base:>7.2f}x "
+              f"{row['p50_ms'] or 0:>8.1f} {row['p90_ms'] or 0:>8.1f} {row['p99_ms'] or 0:>8.1f} {row['errors']:>7}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test /predict on a local instance.")
+    parser.add_argument('--url', default=DEFAULT_URL, help="instance to test (ignored with --spawn-workers)")
+    parser.add_argument('--spawn-workers', type=int, nargs='+', metavar='N',
+                        help="start gunicorn with each of these worker counts and compare them")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="seconds per run")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="client processes")
+    parser.add_argument('--words', type=int, default=DEFAULT_WORDS, help="words per synthetic review")
+    parser.add_argument('--output', help="write results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.spawn_workers:
+        rows = spawn_and_test(args.spawn_workers, args.duration, args.concurrency, args.words)
+    else:
+        rows = [load_test(args.url, args.duration, args.concurrency, args.words)]
+    print_table(rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=4)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
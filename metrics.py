@@ -0,0 +1,165 @@
+"""
+Lightweight in-process metrics for the prediction pipeline, exposed in the
+Prometheus text format. Everything is kept in plain dicts guarded by one
+lock; a disabled Metrics object hands out a no-op timer and records nothing.
+"""
+import time
+import bisect
+import threading
+
+# Stage latency buckets in seconds
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                   0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Review length buckets in characters
+LENGTH_BUCKETS = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Cumulative-bucket histogram as used by Prometheus."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield f'{name}_bucket{_labels(labels, le=le)} {cumulative}'
+        yield f'{name}_sum{_labels(labels)} {self.sum}'
+        yield f'{name}_count{_labels(labels)} {self.count}'
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Stage latency histograms, request/error counters and review lengths."""
+
+    def __init__(self, enabled=True, prefix='sentiment'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._request_durations = {}
+        self._requests = {}
+        self._errors = {}
+        self._review_length = Histogram(LENGTH_BUCKETS)
+
+    def timer(self, stage):
+        """Context manager that records the duration of a pipeline stage."""
+        if not self.enabled:
+            return NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_review_length(self, length):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._review_length.observe(length)
+
+    def observe_request(self, endpoint, status, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            key = (endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 400:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+            histogram = self._request_durations.get(endpoint)
+            if histogram is None:
+                histogram = self._request_durations[endpoint] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += _header(f'{p}_stage_duration_seconds', 'histogram', 'Time spent in each prediction pipeline stage.')
+            for stage, histogram in sorted(self._stages.items()):
+                lines += histogram.samples(f'{p}_stage_duration_seconds', {'stage': stage})
+
+            lines += _header(f'{p}_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+            for endpoint, histogram in sorted(self._request_durations.items()):
+                lines += histogram.samples(f'{p}_request_duration_seconds', {'endpoint': endpoint})
+
+            lines += _header(f'{p}_requests_total', 'counter', 'Requests by endpoint and status code.')
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'{p}_requests_total{_labels({"endpoint": endpoint, "status": str(status)})} {count}')
+
+            lines += _header(f'{p}_errors_total', 'counter', 'Requests answered with a 4xx/5xx status.')
+            for endpoint, count in sorted(self._errors.items()):
+                lines.append(f'{p}_errors_total{_labels({"endpoint": endpoint})} {count}')
+
+            lines += _header(f'{p}_review_length_chars', 'histogram', 'Length of scored reviews in characters.')
+            lines += self._review_length.samples(f'{p}_review_length_chars', {})
+        return '\n'.join(lines) + '\n'
+
+
+def format_metric(name, metric_type, help_text, samples):
+    """Formats extra metrics: samples is a list of (labels dict, value)."""
+    lines = _header(name, metric_type, help_text)
+    for labels, value in samples:
+        lines.append(f'{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _header(name, metric_type, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+
+
+def _labels(labels, **extra):
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ''
+    escaped = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in items
+    )
+    return '{' + escaped + '}'
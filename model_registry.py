@@ -0,0 +1,242 @@
+import os
+import time
+import pickle
+import shutil
+import hashlib
+import tempfile
+import threading
+from compact_model import load_compact_model
+from explain import make_explainer
+
+MODEL_FILE = 'sentiment_model.pkl'
+VECTORIZER_FILE = 'tfidf_vectorizer.pkl'
+COMPACT_SUBDIR = 'compact'
+# Every training run writes a new directory under models/versions/; the
+# file models/current names the one to serve and is swapped with os.replace,
+# so a reload never sees a half-written version and a rollback is one swap
+VERSIONS_SUBDIR = 'versions'
+CURRENT_FILE = 'current'
+# Versions kept on disk (the current one is never removed)
+KEEP_VERSIONS = 5
+
+
+class ModelBundle:
+    """
+    One loaded model version: the classifier, its vectorizer, an explainer
+    (None for hashed features) and a version id. Bundles are never modified after loading, so a request that holds a
+    reference keeps using one consistent model even if a reload happens.
+    """
+
+    __slots__ = ('model', 'vectorizer', 'explainer', 'version', 'source', 'version_dir', 'loaded_at')
+
+    def __init__(self, model, vectorizer, version, source, version_dir=None):
+        self.model = model
+        self.vectorizer = vectorizer
+        # Reverse vocabulary for explain=true, built once per version
+        self.explainer = make_explainer(model, vectorizer)
+        self.version = version
+        self.source = source
+        # Directory the artifacts were loaded from
+        self.version_dir = version_dir
+        self.loaded_at = time.time()
+
+
+def _artifact_files(model_dir):
+    """(files, source): the compact artifact if model_dir has one, else the pickles."""
+    compact_dir = os.path.join(model_dir, COMPACT_SUBDIR)
+    if os.path.exists(os.path.join(compact_dir, 'meta.json')):
+        return [os.path.join(compact_dir, name) for name in sorted(os.listdir(compact_dir))], 'compact'
+    return [os.path.join(model_dir, MODEL_FILE), os.path.join(model_dir, VECTORIZER_FILE)], 'pickle'
+
+
+def load_bundle(model_dir):
+    """
+    Loads the artifacts in model_dir (the compact format if present, else
+    the pickles) and runs one prediction so the weights are paged in before
+    the bundle serves traffic. The version is a hash of the artifact files,
+    so every worker reports the same version for the same files.
+    """
+    files, source = _artifact_files(model_dir)
+    if source == 'compact':
+        model, vectorizer = load_compact_model(os.path.dirname(files[0]))
+    else:
+        with open(files[0], 'rb') as f:
+            model = pickle.load(f)
+        with open(files[1], 'rb') as f:
+            vectorizer = pickle.load(f)
+
+    # Warm up
+    model.predict(vectorizer.transform(['warm up the model']))
+    return ModelBundle(model, vectorizer, _fingerprint(files), source, model_dir)
+
+
+def artifact_version(model_dir):
+    """The version load_bundle would report for model_dir, without loading it."""
+    files, _ = _artifact_files(model_dir)
+    return _fingerprint(files)
+
+
+def current_version_dir(model_dir):
+    """Directory of the version named by model_dir/current, or None if none was published."""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE), 'r') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(model_dir, VERSIONS_SUBDIR, version) if version else None
+
+
+def load_current_bundle(model_dir):
+    """load_bundle for the current version in model_dir."""
+    version_dir = current_version_dir(model_dir)
+    if version_dir is None:
+        raise FileNotFoundError(f"No model version published in {model_dir}; train one with model_training.py")
+    return load_bundle(version_dir)
+
+
+def new_version_dir(model_dir):
+    """Empty staging directory for the artifacts of a new version; publish it with publish_version."""
+    versions_dir = os.path.join(model_dir, VERSIONS_SUBDIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix='.staging-', dir=versions_dir)
+
+
+def publish_version(model_dir, staging_dir, keep=KEEP_VERSIONS):
+    """
+    Renames a complete staging directory to versions/<version> (the same hash
+    load_bundle reports), makes it the current version and removes the oldest
+    versions beyond keep. Returns the version.
+    """
+    version = artifact_version(staging_dir)
+    version_dir = os.path.join(model_dir, VERSIONS_SUBDIR, version)
+    if os.path.exists(version_dir):
+        # Same artifacts as a version already on disk
+        shutil.rmtree(staging_dir)
+    else:
+        os.rename(staging_dir, version_dir)
+    set_current_version(model_dir, version)
+    prune_versions(model_dir, keep)
+    return version
+
+
+def set_current_version(model_dir, version):
+    """Points model_dir/current at an existing version (also how to roll back)."""
+    if not os.path.isdir(os.path.join(model_dir, VERSIONS_SUBDIR, version)):
+        raise ValueError(f"Unknown model version '{version}' (versions: {', '.join(list_versions(model_dir))})")
+    tmp_path = os.path.join(model_dir, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+
+
+def list_versions(model_dir):
+    """Published versions in model_dir, oldest first."""
+    versions_dir = os.path.join(model_dir, VERSIONS_SUBDIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    names = [name for name in os.listdir(versions_dir)
+             if not name.startswith('.') and os.path.isdir(os.path.join(versions_dir, name))]
+    return sorted(names, key=lambda name: os.path.getmtime(os.path.join(versions_dir, name)))
+
+
+def prune_versions(model_dir, keep=KEEP_VERSIONS):
+    """Removes the oldest versions so that at most keep remain, the current one included."""
+    current = current_version_dir(model_dir)
+    old = [name for name in list_versions(model_dir)
+           if os.path.join(model_dir, VERSIONS_SUBDIR, name) != current]
+    for name in old[:max(0, len(old) - (keep - 1))]:
+        shutil.rmtree(os.path.join(model_dir, VERSIONS_SUBDIR, name), ignore_errors=True)
+
+
+def _fingerprint(paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle. A reload builds and warms a new bundle and
+    then swaps it in with a single reference assignment; requests read
+    registry.active once and are never blocked by a reload.
+    """
+
+    def __init__(self, model_dir, on_swap=None):
+        self.model_dir = model_dir
+        self.on_swap = on_swap
+        self.active = None
+        self.loading = False
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def reload(self):
+        """Loads the current version synchronously and swaps it in. Returns the new bundle."""
+        with self._reload_lock:
+            self.loading = True
+            try:
+                bundle = load_current_bundle(self.model_dir)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                self.loading = False
+            self.last_error = None
+            self.active = bundle
+        if self.on_swap:
+            self.on_swap(bundle)
+        return bundle
+
+    def reload_async(self):
+        """Starts a background reload. Returns False if one is already running."""
+        if self.loading or self._reload_lock.locked():
+            return False
+        thread = threading.Thread(target=self._reload_quietly, name='model-reload', daemon=True)
+        thread.start()
+        return True
+
+    def _reload_quietly(self):
+        try:
+            bundle = self.reload()
+            print(f"Model version {bundle.version} loaded ({bundle.source}).")
+        except Exception as e:
+            print(f"Error reloading models: {e}")
+
+    def start_watcher(self, interval):
+        """
+        Checks model_dir/current every interval seconds and reloads when it
+        names a version other than the one serving. Versions are complete
+        before the pointer moves, so there is nothing to wait for.
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        # Compared with the bundle actually serving, not with the pointer at
+        # start: a worker forked from a preloaded master may hold an older
+        # version, and a failed load is retried on the next check
+        while True:
+            time.sleep(interval)
+            current = current_version_dir(self.model_dir)
+            active = self.active
+            if current is not None and (active is None or active.version_dir != current):
+                self._reload_quietly()
+
+    def status(self):
+        bundle = self.active
+        return {
+            'loaded': bundle is not None,
+            'version': bundle.version if bundle else None,
+            'source': bundle.source if bundle else None,
+            'loaded_at': bundle.loaded_at if bundle else None,
+            'loading': self.loading,
+            'last_error': self.last_error,
+        }
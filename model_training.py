@@ -1,19 +1,190 @@
 import pandas as pd
+import numpy as np
 import pickle
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
+import copy
+import json
+import time
+import argparse
+import sqlite3
+import hashlib
+import shutil
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.svm import LinearSVC
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-from preprocessing import clean_text, assign_three_way_label
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split, ParameterGrid
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, f1_score
+from sklearn.utils.class_weight import compute_sample_weight
+from preprocessing import clean_texts, assign_three_way_labels, LEXICON_VERSION
+from compact_model import export_compact_model, load_compact_model, QUANTIZE_DTYPES
+from model_registry import (
+    artifact_version, current_version_dir, new_version_dir, publish_version, set_current_version, list_versions,
+    MODEL_FILE, VECTORIZER_FILE, COMPACT_SUBDIR, VERSIONS_SUBDIR
+)
 
 # Configuration
 DATA_PATH = 'amazon_review_200thousand.csv'
 MODEL_DIR = 'models'
-MODEL_PATH = os.path.join(MODEL_DIR, 'sentiment_model.pkl')
-VECTORIZER_PATH = os.path.join(MODEL_DIR, 'tfidf_vectorizer.pkl')
+# Each save writes the pickles, the memory-mappable compact copy (preferred
+# by the app) and training_meta.json to a new models/versions/<version>/
+# and then points models/current at it (see model_registry.py).
+# training_meta.json records how many rows the model has seen; incremental
+# updates weight by it
+TRAINING_META_FILE = 'training_meta.json'
 
-def load_and_prepare_data(filepath):
+# Preprocessing defaults: 1 worker keeps everything in this process
+DEFAULT_WORKERS = 1
+DEFAULT_CHUNK_SIZE = 5000
+
+# Streaming mode: CSV rows read per chunk and size of the hashed feature space
+STREAM_CHUNK_ROWS = 100000
+STREAM_N_FEATURES = 2 ** 20
+SENTIMENT_CLASSES = ['Negative', 'Neutral', 'Positive']
+
+# Incremental mode: share of the new rows held out for the accuracy report
+INCREMENTAL_HOLDOUT = 0.2
+
+# On-disk cache of cleaned text and heuristic labels, one row per review
+CACHE_DIR = 'cache'
+PREPROCESS_CACHE_PATH = os.path.join(CACHE_DIR, 'preprocess_cache.sqlite')
+
+# Sweep mode: every vectorizer setting is combined with every classifier
+# setting. Override with --sweep-grid grid.json ({"vectorizer": {...}, "model": {...}}).
+SWEEP_VECTORIZER_GRID = {
+    'max_features': [10000, 30000],
+    'ngram_range': [(1, 1), (1, 2)],
+    'sublinear_tf': [False, True],
+}
+SWEEP_MODEL_GRID = {
+    'C': [0.1, 0.5, 1.0],
+    'class_weight': ['balanced'],
+}
+# Fitted vectorizers and their train/test matrices, reused by later sweeps
+SWEEP_CACHE_DIR = os.path.join(CACHE_DIR, 'sweep')
+SWEEP_RESULTS_PATH = os.path.join(MODEL_DIR, 'sweep_results.csv')
+SWEEP_METRICS = ['f1_macro', 'accuracy', 'f1_weighted']
+
+def review_hash(review):
+    """Content hash used as the cache key for a review."""
+    return hashlib.blake2b(str(review).encode('utf-8'), digest_size=16).digest()
+
+class PreprocessCache:
+    """
+    SQLite store of (clean_review, sentiment3) keyed by review_hash. The
+    lexicon version from preprocessing.py is stored alongside; when it
+    changes, every cached row is dropped, because the labels may differ.
+    """
+
+    # SQLite limits the number of parameters in one statement
+    LOOKUP_BATCH = 500
+
+    def __init__(self, path=PREPROCESS_CACHE_PATH, version=LEXICON_VERSION):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews "
+            "(hash BLOB PRIMARY KEY, clean_review TEXT, sentiment3 TEXT) WITHOUT ROWID"
+        )
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'lexicon_version'").fetchone()
+        if row is None or row[0] != version:
+            if row is not None:
+                print(f"Lexicon changed ({row[0]} -> {version}), invalidating preprocessing cache")
+            self.conn.execute("DELETE FROM reviews")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('lexicon_version', ?)", (version,))
+            self.conn.commit()
+
+    def lookup(self, hashes):
+        """Returns {hash: (clean_review, sentiment3)} for the hashes already cached."""
+        hashes = list(hashes)
+        found = {}
+        for i in range(0, len(hashes), self.LOOKUP_BATCH):
+            batch = hashes[i:i + self.LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT hash, clean_review, sentiment3 FROM reviews WHERE hash IN ({placeholders})",
+                batch,
+            )
+            for key, clean_review, label in rows:
+                found[key] = (clean_review, label)
+        return found
+
+    def store(self, rows):
+        """Stores an iterable of (hash, clean_review, sentiment3)."""
+        self.conn.executemany("INSERT OR REPLACE INTO reviews VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def analyze_chunk(reviews):
+    """
+    Runs the cleaning and heuristic labeling on one shard of reviews.
+    Module-level so it can be sent to worker processes. The labels come
+    from the batch labeler, which gives the same labels as analyze_reviews.
+    """
+    return clean_texts(reviews), assign_three_way_labels(reviews)
+
+def preprocess_reviews(reviews, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    """
+    Cleans and labels reviews, sharding them across a process pool.
+    Returns (clean_reviews, labels) as lists in the same order as the input,
+    so results do not depend on the number of workers.
+    workers=0 uses every core. With a PreprocessCache only reviews that are
+    not cached yet are processed, and their results are added to the cache.
+    """
+    reviews = list(reviews)
+    if cache is None:
+        return run_preprocessing(reviews, workers, chunk_size)
+
+    keys = [review_hash(review) for review in reviews]
+    cached = cache.lookup(set(keys))
+    # Each distinct missing review is processed once
+    missing = {}
+    for key, review in zip(keys, reviews):
+        if key not in cached and key not in missing:
+            missing[key] = review
+    print(f"Preprocessing cache: {len(reviews) - sum(1 for k in keys if k not in cached)} hits, "
+          f"{len(missing)} reviews to process")
+
+    if missing:
+        clean_missing, labels_missing = run_preprocessing(list(missing.values()), workers, chunk_size)
+        new_rows = list(zip(missing.keys(), clean_missing, labels_missing))
+        cache.store(new_rows)
+        for key, clean_review, label in new_rows:
+            cached[key] = (clean_review, label)
+
+    clean_reviews = [cached[key][0] for key in keys]
+    labels = [cached[key][1] for key in keys]
+    return clean_reviews, labels
+
+def run_preprocessing(reviews, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Runs analyze_chunk over the reviews, in a process pool when workers > 1."""
+    if not workers:
+        workers = os.cpu_count() or 1
+    chunks = [reviews[i:i + chunk_size] for i in range(0, len(reviews), chunk_size)]
+
+    start = time.perf_counter()
+    if workers > 1 and len(chunks) > 1:
+        # executor.map yields results in submission order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(analyze_chunk, chunks))
+    else:
+        parts = [analyze_chunk(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - start
+
+    clean_reviews = [text for part in parts for text in part[0]]
+    labels = [label for part in parts for label in part[1]]
+    rate = len(reviews) / elapsed if elapsed > 0 else float('inf')
+    print(f"Preprocessed {len(reviews)} reviews in {elapsed:.1f}s "
+          f"({rate:.0f} rows/s, {workers} worker(s), chunk size {chunk_size})")
+    return clean_reviews, labels
+
+def load_and_prepare_data(filepath, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
     print("Loading data...")
     
     # Read the entire dataset to ensure we get all labels (file is ~90MB, so it fits in memory)
@@ -45,49 +216,581 @@ def load_and_prepare_data(filepath):
     print(df['sentiment'].value_counts())
 
     
-    print("Cleaning text...")
-    df['clean_review'] = df['review'].apply(clean_text)
-    # Assign 3-way labels using heuristics
-    print("Assigning 3-way labels using heuristics based on aspect sentiment and sarcasm detection...")
-    df['sentiment3'] = df['review'].apply(assign_three_way_label)
+    # Clean text and assign 3-way labels in a single pass per review
+    print("Cleaning text and assigning 3-way labels using heuristics based on aspect sentiment and sarcasm detection...")
+    df['clean_review'], df['sentiment3'] = preprocess_reviews(df['review'], workers, chunk_size, cache)
     print("Sentiment3 distribution:")
     print(df['sentiment3'].value_counts())
     
     return df
 
-def train_model():
+def new_vectorizer(**params):
+    settings = {'max_features': 10000, 'ngram_range': (1, 2)}
+    settings.update(params)
+    return TfidfVectorizer(**settings)
+
+def new_model(**params):
+    settings = {'class_weight': 'balanced', 'random_state': 42}
+    settings.update(params)
+    return LinearSVC(**settings)
+
+def train_model(workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE, use_cache=True, quantize=None):
     if not os.path.exists(MODEL_DIR):
         os.makedirs(MODEL_DIR)
         
-    df = load_and_prepare_data(DATA_PATH)
+    cache = PreprocessCache() if use_cache else None
+    df = load_and_prepare_data(DATA_PATH, workers, chunk_size, cache)
+    if cache:
+        cache.close()
     
     print("Preparing dataset for training (including optional seed upsampling)...")
     balanced_df = df
 
     print("Vectorizing...")
-    vectorizer = TfidfVectorizer(max_features=10000, ngram_range=(1, 2))
+    vectorizer = new_vectorizer()
     X = vectorizer.fit_transform(balanced_df['clean_review'])
     y = balanced_df['sentiment3']
 
     print("Splitting data...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, y_train, y_test, _, text_test = train_test_split(
+        X, y, balanced_df['clean_review'], test_size=0.2, random_state=42, stratify=y)
 
     print("Training SVM with class weighting for class imbalance...")
-    model = LinearSVC(class_weight='balanced', random_state=42)
+    model = new_model()
     model.fit(X_train, y_train)
     
     print("Evaluating...")
     y_pred = model.predict(X_test)
     print(classification_report(y_test, y_pred))
     
+    version_dir = save_artifacts(model, vectorizer, training_meta('full', X_train.shape[0]), quantize)
+    if quantize:
+        report_compact_export(model, vectorizer, text_test, version_dir)
+    print("Done!")
+
+def save_artifacts(model, vectorizer, meta, quantize=None):
+    """
+    Writes the pickles, the compact artifact and the training meta (if not
+    None) to a new version directory, then makes it the current version. The app and any
+    reload only ever see complete versions. Returns the version directory.
+    """
     print("Saving model and vectorizer...")
-    with open(MODEL_PATH, 'wb') as f:
-        pickle.dump(model, f)
-        
-    with open(VECTORIZER_PATH, 'wb') as f:
-        pickle.dump(vectorizer, f)
-        
+    staging_dir = new_version_dir(MODEL_DIR)
+    try:
+        with open(os.path.join(staging_dir, MODEL_FILE), 'wb') as f:
+            pickle.dump(model, f)
+
+        with open(os.path.join(staging_dir, VECTORIZER_FILE), 'wb') as f:
+            pickle.dump(vectorizer, f)
+
+        export_compact(model, vectorizer, staging_dir, quantize)
+        if meta is not None:
+            with open(os.path.join(staging_dir, TRAINING_META_FILE), 'w') as f:
+                json.dump(meta, f, indent=4)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    version = publish_version(MODEL_DIR, staging_dir)
+    print(f"Model version {version} is now current")
+    return os.path.join(MODEL_DIR, VERSIONS_SUBDIR, version)
+
+def artifacts_dir():
+    """
+    Directory of the current version. Models saved before versions existed
+    sit directly in models/; they are read from there so --export-only or
+    --incremental can publish them as a first version.
+    """
+    version_dir = current_version_dir(MODEL_DIR)
+    return version_dir if version_dir else MODEL_DIR
+
+def load_artifacts():
+    directory = artifacts_dir()
+    with open(os.path.join(directory, MODEL_FILE), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(directory, VECTORIZER_FILE), 'rb') as f:
+        vectorizer = pickle.load(f)
+    return model, vectorizer
+
+def load_training_meta():
+    path = os.path.join(artifacts_dir(), TRAINING_META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def training_meta(mode, trained_rows, increments=0):
+    return {
+        'mode': mode,
+        'trained_rows': int(trained_rows),
+        'increments': increments,
+        'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def export_compact(model, vectorizer, directory, quantize=None):
+    """
+    Writes the memory-mapped artifact next to the pickles in directory, with
+    float16/int8 weights if quantize is set. Hashing vectorizers (streaming
+    mode) have no vocabulary to export and are skipped.
+    """
+    if not hasattr(vectorizer, 'vocabulary_'):
+        print("Skipping compact export (vectorizer has no vocabulary)")
+        return
+    compact_dir = os.path.join(directory, COMPACT_SUBDIR)
+    print("Exporting compact model" + (f" ({quantize})..." if quantize else "..."))
+    export_compact_model(model, vectorizer, compact_dir, quantize)
+
+def traced_bytes(load):
+    """Python heap held by the object(s) load() returns (memory-mapped arrays are not counted)."""
+    tracemalloc.start()
+    try:
+        loaded = load()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del loaded
+    return size
+
+def report_compact_export(model, vectorizer, texts, version_dir):
+    """
+    Compares the compact model exported to version_dir with the float64
+    sklearn model on texts (the test split) and prints the agreement rate
+    and the memory a worker needs for each.
+    """
+    texts = list(texts)
+    compact_dir = os.path.join(version_dir, COMPACT_SUBDIR)
+    compact_model, compact_vectorizer = load_compact_model(compact_dir)
+    expected = model.predict(vectorizer.transform(texts))
+    got = compact_model.predict(compact_vectorizer.transform(texts))
+    agreement = float(np.mean(expected == got)) if texts else 1.0
+
+    pickled = pickle.dumps((model, vectorizer), protocol=pickle.HIGHEST_PROTOCOL)
+    pickle_heap = traced_bytes(lambda: pickle.loads(pickled))
+    compact_heap = traced_bytes(lambda: load_compact_model(compact_dir))
+    mapped = sum(os.path.getsize(os.path.join(compact_dir, name))
+                 for name in os.listdir(compact_dir) if name.endswith('.npy'))
+    float64_arrays = (np.asarray(model.coef_, dtype=np.float64).nbytes + np.asarray(vectorizer.idf_).nbytes
+                      + np.array(sorted(vectorizer.vocabulary_)).nbytes)
+
+    print(f"Agreement with the float64 model on {len(texts)} test reviews: {agreement:.4%}")
+    print(f"Per worker, pickles: {pickle_heap / 1024:.0f} KiB of private heap")
+    print(f"Per worker, compact: {compact_heap / 1024:.0f} KiB private + {mapped / 1024:.0f} KiB memory-mapped "
+          f"(float64 arrays would be {float64_arrays / 1024:.0f} KiB)")
+    print(f"Saved per worker vs pickles: {(pickle_heap - compact_heap) / 1024:.0f} KiB private; "
+          f"mapped arrays {(1 - mapped / float64_arrays):.0%} smaller than float64")
+    return {'agreement': agreement, 'pickle_heap_bytes': pickle_heap,
+            'compact_heap_bytes': compact_heap, 'mapped_bytes': mapped, 'float64_array_bytes': float64_arrays}
+
+def export_existing_artifacts(quantize=None, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE, use_cache=True):
+    """
+    Converts the pickles of the current model to the compact format and
+    publishes the result as a new version. When quantizing, the same test
+    split as train_model is rebuilt from DATA_PATH (if present) for the
+    agreement report.
+    """
+    model, vectorizer = load_artifacts()
+    version_dir = save_artifacts(model, vectorizer, load_training_meta(), quantize)
+    if quantize and hasattr(vectorizer, 'vocabulary_'):
+        if os.path.exists(DATA_PATH):
+            cache = PreprocessCache() if use_cache else None
+            df = load_and_prepare_data(DATA_PATH, workers, chunk_size, cache)
+            if cache:
+                cache.close()
+            _, text_test = train_test_split(df['clean_review'], test_size=0.2, random_state=42,
+                                            stratify=df['sentiment3'])
+        else:
+            print(f"{DATA_PATH} not found; agreement is not measured")
+            text_test = []
+        report_compact_export(model, vectorizer, text_test, version_dir)
+    print("Done!")
+
+def iter_prepared_chunks(filepath, chunk_rows=STREAM_CHUNK_ROWS, workers=DEFAULT_WORKERS,
+                         chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    """
+    Reads the CSV chunk_rows at a time and yields (clean_reviews, labels) for
+    each chunk, so only one chunk is ever held in memory.
+    """
+    reader = pd.read_csv(filepath, header=None, names=['label', 'title', 'review'],
+                         chunksize=chunk_rows)
+    for chunk in reader:
+        chunk = chunk.dropna(subset=['review'])
+        if len(chunk):
+            yield preprocess_reviews(chunk['review'], workers, chunk_size, cache)
+
+def train_model_streaming(workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                          chunk_rows=STREAM_CHUNK_ROWS, use_cache=True):
+    """
+    Out-of-core training for datasets larger than RAM. A HashingVectorizer
+    needs no fitted vocabulary and an SGDClassifier with hinge loss (a linear
+    SVM) is updated with partial_fit one chunk at a time, so peak memory
+    depends on chunk_rows, not on the size of the CSV.
+
+    Every 5th row is held out. It is scored before the model trains on its
+    chunk (progressive validation), and only a confusion matrix is kept.
+    """
+    if not os.path.exists(MODEL_DIR):
+        os.makedirs(MODEL_DIR)
+
+    vectorizer = HashingVectorizer(n_features=STREAM_N_FEATURES, ngram_range=(1, 2),
+                                   alternate_sign=False)
+    model = SGDClassifier(loss='hinge', random_state=42)
+    confusion = np.zeros((len(SENTIMENT_CLASSES), len(SENTIMENT_CLASSES)), dtype=np.int64)
+    rows_seen = 0
+    trained_rows = 0
+    trained = False
+
+    cache = PreprocessCache() if use_cache else None
+    print("Streaming training data...")
+    for clean_reviews, labels in iter_prepared_chunks(DATA_PATH, chunk_rows, workers, chunk_size, cache):
+        X = vectorizer.transform(clean_reviews)
+        y = np.asarray(labels)
+        test_mask = np.arange(rows_seen, rows_seen + len(y)) % 5 == 0
+        rows_seen += len(y)
+
+        if trained and test_mask.any():
+            y_pred = model.predict(X[test_mask])
+            confusion += confusion_matrix(y[test_mask], y_pred, labels=SENTIMENT_CLASSES)
+
+        train_mask = ~test_mask
+        if train_mask.any():
+            # class_weight='balanced' is not available with partial_fit; weight per chunk instead
+            weights = compute_sample_weight('balanced', y[train_mask])
+            model.partial_fit(X[train_mask], y[train_mask], classes=SENTIMENT_CLASSES,
+                              sample_weight=weights)
+            trained_rows += int(train_mask.sum())
+            trained = True
+        print(f"Trained on {rows_seen} rows so far")
+    if cache:
+        cache.close()
+
+    if not trained:
+        print("No training data found.")
+        return
+
+    print("Evaluating (progressive validation on held-out rows)...")
+    total = confusion.sum()
+    if total:
+        print(f"Accuracy: {np.trace(confusion) / total:.3f} on {total} held-out rows")
+        print(pd.DataFrame(confusion, index=SENTIMENT_CLASSES, columns=SENTIMENT_CLASSES))
+
+    save_artifacts(model, vectorizer, training_meta('streaming', trained_rows))
+    print("Done!")
+
+def warm_start_sgd(model, old_rows, total_rows, n_features):
+    """
+    SGDClassifier with the hinge loss seeded with a LinearSVC's weights, so
+    partial_fit continues from them (the decision function is the same).
+    alpha = 1 / (C * rows) is LinearSVC's regularization per row, and the
+    learning rate schedule resumes after old_rows steps instead of taking
+    the large first steps meant for zero weights.
+    """
+    sgd = SGDClassifier(loss='hinge', alpha=1 / (model.C * total_rows), random_state=42)
+    # The attributes partial_fit keeps going from; setting them is what fit(coef_init=...) does,
+    # without its classes check, so new rows that lack a class still work
+    sgd.classes_ = model.classes_
+    sgd.coef_ = np.array(model.coef_, dtype=np.float64, order='C')
+    sgd.intercept_ = np.array(model.intercept_, dtype=np.float64)
+    sgd.n_features_in_ = n_features
+    sgd.t_ = float(old_rows) + 1
+    return sgd
+
+def update_model(model, old_rows, X, y):
+    """
+    Returns a copy of model updated with the rows X, y in time proportional
+    to len(y): one partial_fit pass of hinge-loss SGD. A LinearSVC has
+    neither warm start nor partial_fit, so it is first converted to an
+    SGDClassifier with the same weights (see warm_start_sgd); the updated
+    model is saved as that SGDClassifier. New rows may lack a class.
+    """
+    if isinstance(model, SGDClassifier):
+        model = copy.deepcopy(model)
+    else:
+        model = warm_start_sgd(model, old_rows, old_rows + len(y), X.shape[1])
+    model.partial_fit(X, y, sample_weight=compute_sample_weight('balanced', y))
+    return model
+
+def accuracy(model, X, y):
+    return float(np.mean(model.predict(X) == np.asarray(y)))
+
+def train_model_incremental(new_data_path, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                            use_cache=True, compare_full=False, holdout=INCREMENTAL_HOLDOUT, base_rows=None,
+                            quantize=None):
+    """
+    Updates the model in models/ with the reviews in new_data_path (same CSV
+    layout as DATA_PATH) instead of retraining on everything. The vectorizer
+    is frozen: new rows are transformed with the existing vocabulary/idf (or
+    hash space), so n-grams it has never seen are ignored until the next full
+    retrain. A share of the new rows is held out to report accuracy before
+    and after the update and, with compare_full, against a full retrain on
+    DATA_PATH plus the new rows.
+    """
+    model, vectorizer = load_artifacts()
+    meta = load_training_meta()
+    if base_rows is None:
+        if meta is None:
+            print(f"{TRAINING_META_FILE} not found; pass --base-rows with the number of rows the model was trained on")
+            return
+        base_rows = meta['trained_rows']
+    old_version = artifact_version(artifacts_dir())
+
+    cache = PreprocessCache() if use_cache else None
+    start = time.perf_counter()
+    df = load_and_prepare_data(new_data_path, workers, chunk_size, cache)
+    if cache:
+        cache.close()
+    if holdout > 0:
+        train_df, test_df = train_test_split(df, test_size=holdout, random_state=42)
+    else:
+        train_df, test_df = df, df.iloc[:0]
+
+    print(f"Updating model {old_version} ({base_rows} rows) with {len(train_df)} new rows...")
+    X_new = vectorizer.transform(train_df['clean_review'])
+    updated = update_model(model, base_rows, X_new, train_df['sentiment3'].to_numpy())
+    incremental_seconds = time.perf_counter() - start
+
+    report = {'new_rows': len(train_df), 'held_out_rows': len(test_df),
+              'incremental_seconds': incremental_seconds}
+    if len(test_df):
+        X_test = vectorizer.transform(test_df['clean_review'])
+        y_test = test_df['sentiment3']
+        report['accuracy_before'] = accuracy(model, X_test, y_test)
+        report['accuracy_incremental'] = accuracy(updated, X_test, y_test)
+        if compare_full:
+            print("Full retrain for comparison...")
+            start = time.perf_counter()
+            cache = PreprocessCache() if use_cache else None
+            base_df = load_and_prepare_data(DATA_PATH, workers, chunk_size, cache)
+            if cache:
+                cache.close()
+            full_df = pd.concat([base_df, train_df])
+            full_vectorizer = new_vectorizer()
+            full_model = new_model()
+            full_model.fit(full_vectorizer.fit_transform(full_df['clean_review']), full_df['sentiment3'])
+            report['full_seconds'] = time.perf_counter() - start
+            report['accuracy_full'] = accuracy(full_model, full_vectorizer.transform(test_df['clean_review']), y_test)
+
+        print(f"Held-out accuracy on {len(test_df)} new rows:")
+        print(f"  before update:  {report['accuracy_before']:.4f}")
+        print(f"  incremental:    {report['accuracy_incremental']:.4f} ({incremental_seconds:.1f}s)")
+        if 'accuracy_full' in report:
+            print(f"  full retrain:   {report['accuracy_full']:.4f} ({report['full_seconds']:.1f}s)")
+        # The new rows may not have every class
+        print(classification_report(y_test, updated.predict(X_test), zero_division=0))
+
+    version_dir = save_artifacts(
+        updated, vectorizer,
+        training_meta('incremental', base_rows + len(train_df), (meta or {}).get('increments', 0) + 1), quantize
+    )
+    if quantize and hasattr(vectorizer, 'vocabulary_'):
+        report_compact_export(updated, vectorizer, test_df['clean_review'], version_dir)
+    report['old_version'] = old_version
+    report['new_version'] = os.path.basename(version_dir)
+    print(f"Model version {old_version} -> {report['new_version']}")
+    print("Done!")
+    return report
+
+def load_sweep_grid(path=None):
+    """(vectorizer grid, model grid) from a JSON file, or the defaults."""
+    if path is None:
+        return SWEEP_VECTORIZER_GRID, SWEEP_MODEL_GRID
+    with open(path, 'r') as f:
+        grid = json.load(f)
+    vectorizer_grid = grid.get('vectorizer', SWEEP_VECTORIZER_GRID)
+    # JSON has no tuples
+    if 'ngram_range' in vectorizer_grid:
+        vectorizer_grid = dict(vectorizer_grid, ngram_range=[tuple(r) for r in vectorizer_grid['ngram_range']])
+    return vectorizer_grid, grid.get('model', SWEEP_MODEL_GRID)
+
+def describe_params(params):
+    return ', '.join(f"{k}={v}" for k, v in sorted(params.items()))
+
+def vectorize_for_sweep(params, train_texts, test_texts, data_key):
+    """
+    Fitted vectorizer plus train/test matrices for one vectorizer setting.
+    Results are pickled under SWEEP_CACHE_DIR, keyed by the setting and the
+    exact train/test texts, so rerunning a sweep skips vectorization.
+    """
+    # Keyed on the effective settings, so a grid that spells out a default shares the entry
+    settings = describe_params(new_vectorizer(**params).get_params())
+    key = hashlib.sha1((settings + data_key).encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(SWEEP_CACHE_DIR, key + '.pkl')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    vectorizer = new_vectorizer(**params)
+    X_train = vectorizer.fit_transform(train_texts)
+    X_test = vectorizer.transform(test_texts)
+    os.makedirs(SWEEP_CACHE_DIR, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump((vectorizer, X_train, X_test), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return vectorizer, X_train, X_test
+
+# Train/test data of the current vectorizer setting, set once per sweep worker
+_sweep_data = None
+
+def init_sweep_worker(X_train, y_train, X_test, y_test):
+    global _sweep_data
+    _sweep_data = (X_train, y_train, X_test, y_test)
+
+def evaluate_model_params(params):
+    """Fits one classifier setting on the shared split. Returns (metrics, model)."""
+    X_train, y_train, X_test, y_test = _sweep_data
+    start = time.perf_counter()
+    model = new_model(**params)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    y_pred = model.predict(X_test)
+    return {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'f1_macro': f1_score(y_test, y_pred, average='macro'),
+        'f1_weighted': f1_score(y_test, y_pred, average='weighted'),
+        'fit_seconds': fit_seconds,
+    }, model
+
+def run_sweep(workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE, use_cache=True,
+              grid_path=None, metric='f1_macro', quantize=None):
+    """
+    Hyperparameter sweep: cleans and labels the data once, splits it once, and
+    for each vectorizer setting fits one vectorizer and evaluates every
+    classifier setting on the same matrices across a process pool. Prints a
+    table ranked by metric and saves the best model/vectorizer as artifacts.
+    """
+    if not os.path.exists(MODEL_DIR):
+        os.makedirs(MODEL_DIR)
+    vectorizer_grid, model_grid = load_sweep_grid(grid_path)
+
+    cache = PreprocessCache() if use_cache else None
+    df = load_and_prepare_data(DATA_PATH, workers, chunk_size, cache)
+    if cache:
+        cache.close()
+    train_df, test_df = train_test_split(df, test_size=0.2, random_state=42, stratify=df['sentiment3'])
+    y_train = train_df['sentiment3'].to_numpy()
+    y_test = test_df['sentiment3'].to_numpy()
+    # Identifies the split, so cached matrices are only reused for the same data
+    digest = hashlib.sha1(LEXICON_VERSION.encode('utf-8'))
+    for review in list(train_df['clean_review']) + ['\0'] + list(test_df['clean_review']):
+        digest.update(review.encode('utf-8'))
+        digest.update(b'\0')
+    data_key = digest.hexdigest()
+
+    if not workers:
+        workers = os.cpu_count() or 1
+    model_settings = list(ParameterGrid(model_grid))
+    vectorizer_settings = list(ParameterGrid(vectorizer_grid))
+    print(f"Sweeping {len(vectorizer_settings)} vectorizer x {len(model_settings)} classifier settings "
+          f"on {len(train_df)} train / {len(test_df)} test rows")
+
+    rows = []
+    best = None
+    for vectorizer_params in vectorizer_settings:
+        start = time.perf_counter()
+        vectorizer, X_train, X_test = vectorize_for_sweep(
+            vectorizer_params, train_df['clean_review'], test_df['clean_review'], data_key)
+        vectorize_seconds = time.perf_counter() - start
+        print(f"Vectorizer [{describe_params(vectorizer_params)}]: {X_train.shape[1]} features "
+              f"({vectorize_seconds:.1f}s)")
+
+        split = (X_train, y_train, X_test, y_test)
+        if workers > 1 and len(model_settings) > 1:
+            # The matrices are sent once per worker, not once per setting
+            with ProcessPoolExecutor(max_workers=min(workers, len(model_settings)),
+                                     initializer=init_sweep_worker, initargs=split) as executor:
+                results = list(executor.map(evaluate_model_params, model_settings))
+        else:
+            init_sweep_worker(*split)
+            results = [evaluate_model_params(params) for params in model_settings]
+
+        for model_params, (scores, model) in zip(model_settings, results):
+            rows.append(dict(scores, vectorizer=describe_params(vectorizer_params),
+                             model=describe_params(model_params), vectorize_seconds=vectorize_seconds))
+            if best is None or scores[metric] > best[0]:
+                best = (scores[metric], model, vectorizer, vectorizer_params, model_params)
+
+    table = pd.DataFrame(rows).sort_values(metric, ascending=False).reset_index(drop=True)
+    table.index += 1
+    columns = ['vectorizer', 'model'] + SWEEP_METRICS + ['fit_seconds', 'vectorize_seconds']
+    print(f"\nRanked by {metric}:")
+    print(table[columns].to_string(float_format=lambda v: f"{v:.4f}"))
+    table[columns].to_csv(SWEEP_RESULTS_PATH, index_label='rank')
+
+    score, model, vectorizer, vectorizer_params, model_params = best
+    print(f"\nBest: {describe_params(vectorizer_params)} | {describe_params(model_params)} ({metric}={score:.4f})")
+    version_dir = save_artifacts(model, vectorizer, training_meta('sweep', len(train_df)), quantize)
+    if quantize:
+        report_compact_export(model, vectorizer, test_df['clean_review'], version_dir)
+    print(f"Results written to {SWEEP_RESULTS_PATH}")
     print("Done!")
+    return table
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the TF-IDF + SVM sentiment model.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="processes used for cleaning/labeling (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="reviews per preprocessing shard")
+    parser.add_argument('--streaming', action='store_true',
+                        help="out-of-core training with a hashing vectorizer and partial_fit")
+    parser.add_argument('--stream-chunk-rows', type=int, default=STREAM_CHUNK_ROWS,
+                        help="CSV rows read per chunk in streaming mode")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="ignore the on-disk preprocessing cache")
+    parser.add_argument('--incremental', metavar='CSV',
+                        help="update the model in models/ with the reviews in CSV instead of retraining")
+    parser.add_argument('--holdout', type=float, default=INCREMENTAL_HOLDOUT,
+                        help="share of the new rows held out for the incremental accuracy report")
+    parser.add_argument('--compare-full', action='store_true',
+                        help="also run a full retrain and report its held-out accuracy and time")
+    parser.add_argument('--base-rows', type=int,
+                        help="rows the current model was trained on (read from training_meta.json if omitted)")
+    parser.add_argument('--sweep', action='store_true',
+                        help="grid-search vectorizer/classifier settings and save the best model "
+                             "(--workers sets the number of parallel fits)")
+    parser.add_argument('--sweep-grid', metavar='JSON',
+                        help='grid file: {"vectorizer": {param: [values]}, "model": {param: [values]}}')
+    parser.add_argument('--sweep-metric', choices=SWEEP_METRICS, default='f1_macro',
+                        help="metric used to rank sweep results")
+    parser.add_argument('--quantize', choices=QUANTIZE_DTYPES,
+                        help="export the compact model with float16/int8 weights and a hashed vocabulary, "
+                             "and report agreement with the float64 model")
+    parser.add_argument('--export-only', action='store_true',
+                        help="convert the current model's pickles to the compact format as a new version and exit")
+    parser.add_argument('--list-versions', action='store_true',
+                        help="list the model versions in models/versions/ and exit")
+    parser.add_argument('--rollback', metavar='VERSION',
+                        help="make an earlier version in models/versions/ the current one and exit")
+    return parser.parse_args()
+
+def print_versions():
+    current = current_version_dir(MODEL_DIR)
+    for version in list_versions(MODEL_DIR):
+        marker = '*' if current and os.path.basename(current) == version else ' '
+        print(f"{marker} {version}")
 
 if __name__ == "__main__":
-    train_model()
+    args = parse_args()
+    if args.list_versions:
+        print_versions()
+    elif args.rollback:
+        try:
+            set_current_version(MODEL_DIR, args.rollback)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Model version {args.rollback} is now current")
+    elif args.export_only:
+        export_existing_artifacts(quantize=args.quantize, workers=args.workers, chunk_size=args.chunk_size,
+                                  use_cache=not args.no_cache)
+    elif args.sweep:
+        run_sweep(workers=args.workers, chunk_size=args.chunk_size, use_cache=not args.no_cache,
+                  grid_path=args.sweep_grid, metric=args.sweep_metric, quantize=args.quantize)
+    elif args.incremental:
+        train_model_incremental(args.incremental, workers=args.workers, chunk_size=args.chunk_size,
+                                use_cache=not args.no_cache, compare_full=args.compare_full,
+                                holdout=args.holdout, base_rows=args.base_rows, quantize=args.quantize)
+    elif args.streaming:
+        train_model_streaming(workers=args.workers, chunk_size=args.chunk_size,
+                              chunk_rows=args.stream_chunk_rows, use_cache=not args.no_cache)
+    else:
+        train_model(workers=args.workers, chunk_size=args.chunk_size, use_cache=not args.no_cache,
+                    quantize=args.quantize)
@@ -0,0 +1,190 @@
+"""
+Framing for the Unix socket transport (socket_server.py) and a reference
+client. The format is simple enough to implement in any language.
+
+Every message is one frame: a 5-byte header packed as '>IB' (payload
+length, codec) followed by the payload. Codec 0 is UTF-8 JSON and works
+everywhere; codec 1 is msgpack and needs the msgpack package on both ends.
+
+A request is a map, the same fields as a /predict/batch body plus an id:
+
+    {"id": 7, "texts": ["...", ...], "domain": "apparel", "explain": true, "top_k": 5}
+
+The reply uses the request's codec: {"id": 7, "results": [...]} with the
+same result dicts as /predict/batch, or {"id": 7, "error": "..."}.
+Requests may be pipelined: write any number of frames without waiting for
+replies. Replies on a connection come back in request order.
+"""
+import json
+import select
+import socket
+import struct
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON frames always work
+    msgpack = None
+
+HEADER = struct.Struct('>IB')
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+CODEC_NAMES = {'json': CODEC_JSON, 'msgpack': CODEC_MSGPACK}
+# Larger frames are refused, so a bad length cannot make the server allocate without bound
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+RECV_BYTES = 256 * 1024
+# Requests a client keeps in flight while pipelining
+DEFAULT_WINDOW = 32
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def default_codec():
+    return CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+
+
+def reply_codec(codec):
+    """Codec for replying to a frame: its own, or JSON when msgpack is missing here."""
+    if codec == CODEC_MSGPACK and msgpack is None:
+        return CODEC_JSON
+    return codec
+
+
+def encode(message, codec):
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ProtocolError("msgpack is not installed")
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+
+def decode(payload, codec):
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ProtocolError("msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+
+def encode_frame(message, codec):
+    payload = encode(message, codec)
+    return HEADER.pack(len(payload), codec) + payload
+
+
+def split_frames(buffer):
+    """
+    Complete frames at the start of a bytearray. Returns ([(codec, payload)],
+    bytes consumed); a partial frame at the end is left for the next read.
+    Raises ProtocolError for an oversized frame or an unknown codec.
+    """
+    frames = []
+    offset = 0
+    while len(buffer) - offset >= HEADER.size:
+        length, codec = HEADER.unpack_from(buffer, offset)
+        if codec not in (CODEC_JSON, CODEC_MSGPACK):
+            raise ProtocolError(f"Unknown codec {codec}")
+        if length > MAX_FRAME_BYTES:
+            raise ProtocolError(f"Frame too large ({length} bytes, max {MAX_FRAME_BYTES})")
+        start = offset + HEADER.size
+        if len(buffer) - start < length:
+            break
+        frames.append((codec, bytes(buffer[start:start + length])))
+        offset = start + length
+    return frames, offset
+
+
+class SocketClient:
+    """
+    Blocking client for one connection. predict() sends one batch and waits;
+    predict_many() pipelines a list of batches over the same connection.
+    """
+
+    def __init__(self, path, codec=None, timeout=30):
+        self.codec = default_codec() if codec is None else codec
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._buffer = bytearray()
+        self._replies = []
+        self._next_id = 0
+
+    def send(self, texts, domain=None, explain=False, top_k=None):
+        """Writes one request frame and returns its id."""
+        request_id = self._next_id
+        self._next_id += 1
+        message = {'id': request_id, 'texts': list(texts)}
+        if domain:
+            message['domain'] = domain
+        if explain:
+            message['explain'] = True
+            if top_k is not None:
+                message['top_k'] = top_k
+        self._send(encode_frame(message, self.codec))
+        return request_id
+
+    def _send(self, data):
+        """
+        sendall that keeps reading replies while the socket is not writable.
+        The server does not read while it writes replies, so a pipelining
+        client that only wrote could fill both socket buffers and deadlock.
+        """
+        view = memoryview(data)
+        while view:
+            readable, writable, _ = select.select([self.sock], [self.sock], [], self.sock.gettimeout())
+            if not readable and not writable:
+                raise TimeoutError("Timed out sending a request")
+            if readable:
+                self._read()
+            if writable:
+                view = view[self.sock.send(view):]
+
+    def _read(self):
+        """One recv; complete replies are queued."""
+        chunk = self.sock.recv(RECV_BYTES)
+        if not chunk:
+            raise ConnectionError("Server closed the connection")
+        self._buffer += chunk
+        frames, consumed = split_frames(self._buffer)
+        del self._buffer[:consumed]
+        self._replies.extend(decode(payload, codec) for codec, payload in frames)
+
+    def receive(self):
+        """Next reply on the connection, as a dict."""
+        while not self._replies:
+            self._read()
+        return self._replies.pop(0)
+
+    def predict(self, texts, domain=None, explain=False, top_k=None):
+        """Result dicts for one batch of reviews. Raises RuntimeError on an error reply."""
+        self.send(texts, domain, explain, top_k)
+        reply = self.receive()
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['results']
+
+    def predict_many(self, batches, domain=None, explain=False, top_k=None, window=DEFAULT_WINDOW):
+        """
+        Pipelines batches with up to window requests in flight and returns
+        the replies in order (error replies included as they are).
+        """
+        replies = []
+        in_flight = 0
+        for texts in batches:
+            if in_flight == window:
+                replies.append(self.receive())
+                in_flight -= 1
+            self.send(texts, domain, explain, top_k)
+            in_flight += 1
+        for _ in range(in_flight):
+            replies.append(self.receive())
+        return replies
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
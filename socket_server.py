@@ -0,0 +1,202 @@
+"""
+Unix domain socket transport for the prediction pipeline in app.py, for
+callers on the same host. It skips HTTP parsing, Flask routing and TCP; the
+frame format is described in socket_protocol.py.
+
+The server imports app, so it shares the ModelRegistry (including hot
+reloads), the aspect catalogs, the result caches and /metrics with the HTTP
+endpoints. Frames that are already waiting when a connection is read are
+scored together, one predict_reviews call per (domain, explain) group, so a
+pipelined stream of small batches costs about as much as one large batch.
+
+Standalone, next to or instead of the HTTP app:
+
+    python socket_server.py --socket /tmp/review-sentiment.sock
+
+Under gunicorn, set SOCKET_PATH and every worker also serves the socket
+(see gunicorn.conf.py).
+"""
+import os
+import stat
+import time
+import socket
+import argparse
+import threading
+import socketserver
+import app
+from socket_protocol import (
+    CODEC_JSON, RECV_BYTES, ProtocolError, decode, encode_frame, reply_codec, split_frames
+)
+
+DEFAULT_SOCKET_PATH = '/tmp/review-sentiment.sock'
+LISTEN_BACKLOG = 128
+
+
+def parse_request(message, bundle):
+    """(texts, catalog, top_k, error message or None) for one decoded request."""
+    if not isinstance(message, dict):
+        return None, None, 0, 'Request must be a map'
+    texts = message.get('texts')
+    if not isinstance(texts, list) or not texts:
+        return None, None, 0, 'No texts provided'
+    if len(texts) > app.MAX_BATCH_SIZE:
+        return None, None, 0, f'Batch too large (max {app.MAX_BATCH_SIZE} reviews)'
+    catalog = app.get_catalog(message)
+    if catalog is None:
+        return None, None, 0, f"Unknown domain (domains: {', '.join(sorted(app.catalogs))})"
+    top_k = app.parse_explain_top_k(message.get('explain', False), message.get('top_k', app.DEFAULT_TOP_K))
+    error = app.explain_error(top_k, bundle)
+    if error:
+        return None, None, 0, error
+    return texts, catalog, top_k, None
+
+
+def handle_frames(frames):
+    """
+    Replies for a list of (codec, payload) request frames, in order. Valid
+    requests with the same domain and explain setting are scored as one batch.
+    """
+    start = time.perf_counter()
+    bundle = app.model_registry.active
+    replies = [None] * len(frames)
+    statuses = [400] * len(frames)
+    groups = {}
+    for n, (codec, payload) in enumerate(frames):
+        try:
+            message = decode(payload, codec)
+        except (ValueError, ProtocolError) as e:
+            replies[n] = {'id': None, 'error': f'Invalid frame: {e}'}
+            continue
+        request_id = message.get('id') if isinstance(message, dict) else None
+        # Requests keep being served while the worker drains after SIGTERM;
+        # gunicorn.conf.py stops the socket server in worker_exit
+        if bundle is None:
+            replies[n] = {'id': request_id, 'error': 'Model not loaded'}
+            statuses[n] = 500
+            continue
+        texts, catalog, top_k, error = parse_request(message, bundle)
+        if error:
+            replies[n] = {'id': request_id, 'error': error}
+            continue
+        groups.setdefault((catalog.domain, top_k), []).append((n, request_id, texts))
+
+    for (domain, top_k), requests in groups.items():
+        texts = [text for _, _, batch in requests for text in batch]
+        results = app.predict_batch_results(texts, bundle, app.catalogs[domain], top_k)
+        offset = 0
+        for n, request_id, batch in requests:
+            replies[n] = {'id': request_id, 'results': results[offset:offset + len(batch)]}
+            statuses[n] = 200
+            offset += len(batch)
+
+    if app.metrics.enabled:
+        elapsed = time.perf_counter() - start
+        for status in statuses:
+            app.metrics.observe_request('socket_predict', status, elapsed)
+    return replies
+
+
+class SocketHandler(socketserver.BaseRequestHandler):
+    """One client connection: reads frames until the client disconnects."""
+
+    def handle(self):
+        sock = self.request
+        buffer = bytearray()
+        while True:
+            try:
+                chunk = sock.recv(RECV_BYTES)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+            try:
+                frames, consumed = split_frames(buffer)
+            except ProtocolError as e:
+                # The stream cannot be resynchronized after a bad header
+                try:
+                    sock.sendall(encode_frame({'id': None, 'error': str(e)}, CODEC_JSON))
+                except OSError:
+                    pass
+                return
+            del buffer[:consumed]
+            if not frames:
+                continue
+            replies = handle_frames(frames)
+            try:
+                sock.sendall(b''.join(
+                    encode_frame(reply, reply_codec(codec)) for reply, (codec, _) in zip(replies, frames)
+                ))
+            except OSError:
+                # The client went away
+                return
+
+
+class SocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # One thread per connection; clients that pipeline need only one
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+def bind_socket(path):
+    """
+    Listening Unix socket at path. A stale socket file left by an earlier
+    run is removed first; any other kind of file is left alone.
+    """
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise FileExistsError(f"{path} exists and is not a socket")
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(LISTEN_BACKLOG)
+    return listener
+
+
+def make_server(path=None, listener=None):
+    """
+    SocketServer on a new socket at path, or on an already listening socket
+    (e.g. one bound by the gunicorn master before the workers were forked).
+    """
+    server = SocketServer(path or '', SocketHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = listener if listener is not None else bind_socket(path)
+    server.server_address = server.socket.getsockname()
+    return server
+
+
+def start_socket_server(path=None, listener=None):
+    """Serves the socket from a daemon thread and returns the server (stop it with .shutdown())."""
+    server = make_server(path, listener)
+    thread = threading.Thread(target=server.serve_forever, name='socket-server', daemon=True)
+    thread.start()
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve predictions over a Unix domain socket.")
+    parser.add_argument('--socket', default=os.environ.get('SOCKET_PATH', DEFAULT_SOCKET_PATH),
+                        help="socket path (default: $SOCKET_PATH or %(default)s)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app.create_app()
+    if app.model_registry.active is None:
+        print("Warning: no model loaded; requests will get 'Model not loaded' until one is")
+    server = make_server(args.socket)
+    print(f"Serving predictions on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app.shutdown()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
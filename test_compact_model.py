@@ -0,0 +1,90 @@
+"""
+Checks that the compact artifact (compact_model.py) transforms and predicts
+like the sklearn vectorizer and model it was exported from.
+
+    python -m pytest -q test_compact_model.py
+"""
+import random
+import tracemalloc
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+from compact_model import export_compact_model, load_compact_model, hash_ngrams
+
+LONG_TOKEN_LENGTH = 100000
+
+
+def synthetic_corpus(n, seed=0):
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefghij') for _ in range(rng.randint(2, 9))) for _ in range(400)]
+    docs = [' '.join(rng.choice(words) for _ in range(rng.randint(1, 40))) for _ in range(n)]
+    labels = [rng.choice(['Negative', 'Neutral', 'Positive']) for _ in range(n)]
+    return docs, labels
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    docs, labels = synthetic_corpus(600)
+    vectorizer = TfidfVectorizer(max_features=3000, ngram_range=(1, 2), sublinear_tf=True)
+    model = LinearSVC(random_state=42).fit(vectorizer.fit_transform(docs), labels)
+    return vectorizer, model
+
+
+def test_strings_match_sklearn(fitted, tmp_path):
+    vectorizer, model = fitted
+    export_compact_model(model, vectorizer, str(tmp_path))
+    compact_model, compact_vectorizer = load_compact_model(str(tmp_path))
+    docs, _ = synthetic_corpus(200, seed=1)
+    docs += ['', '!!!', 'UPPER case Words', docs[0] + ' ' + 'x' * LONG_TOKEN_LENGTH + ' ' + docs[1]]
+
+    expected = vectorizer.transform(docs)
+    got = compact_vectorizer.transform(docs)
+    assert abs(got - expected).max() < 1e-12
+    assert (compact_model.predict(got) == model.predict(expected)).all()
+
+
+def compact_columns(vectorizer, quantize):
+    """sklearn column of each compact column (hashed vocabularies are sorted by hash)."""
+    terms = np.array(sorted(vectorizer.vocabulary_))
+    if quantize:
+        terms = terms[np.argsort(hash_ngrams(terms))]
+    return [vectorizer.vocabulary_[t] for t in terms]
+
+
+def peak_bytes(call):
+    tracemalloc.start()
+    try:
+        result = call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+@pytest.mark.parametrize('quantize', [None, 'float16', 'int8'])
+def test_long_token_does_not_blow_up_memory(fitted, tmp_path, quantize):
+    vectorizer, model = fitted
+    export_compact_model(model, vectorizer, str(tmp_path), quantize)
+    _, compact_vectorizer = load_compact_model(str(tmp_path))
+    docs, _ = synthetic_corpus(20, seed=2)
+    # Every n-gram of the batch would be padded to the long token's width
+    docs = [' '.join(docs) + ' ' + 'y' * LONG_TOKEN_LENGTH]
+    got, peak = peak_bytes(lambda: compact_vectorizer.transform(docs))
+    # Quantized exports keep idf as float32
+    assert abs(got - vectorizer.transform(docs)[:, compact_columns(vectorizer, quantize)]).max() < 1e-6
+    assert peak < 20 * 1024 * 1024
+
+
+@pytest.mark.parametrize('quantize', ['float16', 'int8'])
+def test_hashed_vocabulary_matches_sklearn(fitted, tmp_path, quantize):
+    vectorizer, model = fitted
+    export_compact_model(model, vectorizer, str(tmp_path), quantize)
+    compact_model, compact_vectorizer = load_compact_model(str(tmp_path))
+    docs, _ = synthetic_corpus(200, seed=3)
+    docs += ['', 'x' * LONG_TOKEN_LENGTH]
+    expected = vectorizer.transform(docs)
+    got = compact_vectorizer.transform(docs)
+    assert abs(got - expected[:, compact_columns(vectorizer, quantize)]).max() < 1e-6
+    # Quantized weights may flip a near tie
+    assert np.mean(compact_model.predict(got) == model.predict(expected)) > 0.95
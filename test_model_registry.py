@@ -0,0 +1,84 @@
+"""
+Versioned model directories and hot reloads in model_registry.py.
+
+    python -m pytest -q test_model_registry.py
+"""
+import os
+import time
+import pickle
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+from model_registry import (
+    ModelRegistry, new_version_dir, publish_version, set_current_version, current_version_dir,
+    MODEL_FILE, VECTORIZER_FILE
+)
+
+WATCH_INTERVAL = 0.05
+
+
+def publish(model_dir, docs):
+    vectorizer = TfidfVectorizer()
+    model = LinearSVC().fit(vectorizer.fit_transform(docs), ['Negative', 'Positive'] * (len(docs) // 2))
+    staging_dir = new_version_dir(model_dir)
+    with open(os.path.join(staging_dir, MODEL_FILE), 'wb') as f:
+        pickle.dump(model, f)
+    with open(os.path.join(staging_dir, VECTORIZER_FILE), 'wb') as f:
+        pickle.dump(vectorizer, f)
+    return publish_version(model_dir, staging_dir)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(WATCH_INTERVAL)
+    return False
+
+
+def test_publish_points_current_at_the_new_version(tmp_path):
+    model_dir = str(tmp_path)
+    a = publish(model_dir, ['bad', 'good'])
+    b = publish(model_dir, ['awful', 'great'])
+    assert current_version_dir(model_dir) == os.path.join(model_dir, 'versions', b)
+    registry = ModelRegistry(model_dir)
+    assert registry.reload().version == b
+    set_current_version(model_dir, a)
+    assert registry.reload().version == a
+
+
+def test_watcher_reloads_a_bundle_older_than_current(tmp_path):
+    # A worker forked from a preloaded master holds the master's bundle,
+    # even if current moved on before the watcher started
+    model_dir = str(tmp_path)
+    a = publish(model_dir, ['bad', 'good'])
+    registry = ModelRegistry(model_dir)
+    registry.reload()
+    b = publish(model_dir, ['awful', 'great'])
+    registry.start_watcher(WATCH_INTERVAL)
+    assert wait_for(lambda: registry.active.version == b)
+    assert a != b
+
+
+def test_watcher_retries_a_failed_load(tmp_path):
+    model_dir = str(tmp_path)
+    a = publish(model_dir, ['bad', 'good'])
+    registry = ModelRegistry(model_dir)
+    registry.reload()
+    registry.start_watcher(WATCH_INTERVAL)
+    broken_dir = os.path.join(model_dir, 'versions', 'broken')
+    os.makedirs(broken_dir)
+    set_current_version(model_dir, 'broken')
+    assert wait_for(lambda: registry.last_error is not None)
+    assert registry.active.version == a
+
+    # The version becomes loadable later
+    with open(os.path.join(model_dir, 'versions', a, MODEL_FILE), 'rb') as f:
+        model = f.read()
+    with open(os.path.join(model_dir, 'versions', a, VECTORIZER_FILE), 'rb') as f:
+        vectorizer = f.read()
+    with open(os.path.join(broken_dir, VECTORIZER_FILE), 'wb') as f:
+        f.write(vectorizer)
+    with open(os.path.join(broken_dir, MODEL_FILE), 'wb') as f:
+        f.write(model)
+    assert wait_for(lambda: registry.active.version_dir == broken_dir)
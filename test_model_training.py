@@ -0,0 +1,49 @@
+"""
+Incremental updates in model_training.py.
+
+    python -m pytest -q test_model_training.py
+"""
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.linear_model import SGDClassifier
+from model_training import new_model, update_model, warm_start_sgd
+
+CLASSES = np.array(['Negative', 'Neutral', 'Positive'])
+
+
+def dataset(n, seed):
+    X, y = make_classification(n, 40, n_informative=12, n_classes=3, random_state=seed)
+    return X, CLASSES[y]
+
+
+def test_warm_start_keeps_the_decision_function():
+    X, y = dataset(2000, 0)
+    model = new_model().fit(X, y)
+    sgd = warm_start_sgd(model, len(y), len(y), X.shape[1])
+    assert np.allclose(sgd.decision_function(X), model.decision_function(X))
+    assert (sgd.predict(X) == model.predict(X)).all()
+
+
+def test_update_moves_the_weights():
+    X, y = dataset(2000, 0)
+    model = new_model().fit(X, y)
+    X_new, y_new = dataset(500, 1)
+    updated = update_model(model, len(y), X_new, y_new)
+    assert isinstance(updated, SGDClassifier)
+    assert not np.allclose(updated.coef_, model.coef_)
+    # The original model is left alone
+    assert np.allclose(model.coef_, new_model().fit(X, y).coef_)
+    # A second update continues from the first one
+    again = update_model(updated, len(y) + len(y_new), X_new, y_new)
+    assert again.t_ > updated.t_
+
+
+def test_update_with_missing_classes():
+    X, y = dataset(2000, 0)
+    model = new_model().fit(X, y)
+    X_new, y_new = dataset(500, 1)
+    for keep in (['Negative', 'Positive'], ['Positive']):
+        mask = np.isin(y_new, keep)
+        updated = update_model(model, len(y), X_new[mask], y_new[mask])
+        assert list(updated.classes_) == list(CLASSES)
+        assert updated.coef_.shape == model.coef_.shape
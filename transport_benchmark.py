@@ -0,0 +1,193 @@
+"""
+Compares the HTTP endpoints with the Unix socket transport.
+
+Starts gunicorn (gunicorn.conf.py) with SOCKET_PATH set, so both transports
+are served by the same worker and model, and sends the same number of
+requests of each batch size through:
+
+    http              /predict (batch 1) or /predict/batch, one connection
+    socket            one frame at a time, waiting for each reply
+    socket-pipelined  up to --window frames in flight on one connection
+
+    python transport_benchmark.py --batch-sizes 1 10 100 --requests 500
+    python transport_benchmark.py --url http://127.0.0.1:8000 --socket /tmp/review-sentiment.sock
+
+Every mode gets its own synthetic reviews, so none of them is served from
+the result caches warmed by another.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from benchmark import synthetic_reviews, percentile
+from load_test import wait_until_ready
+from socket_protocol import SocketClient, CODEC_NAMES, DEFAULT_WINDOW, default_codec
+
+DEFAULT_BATCH_SIZES = [1, 10, 100]
+DEFAULT_REQUESTS = 500
+DEFAULT_WORDS = 50
+BENCH_PORT = 8600
+MODES = ['http', 'socket', 'socket-pipelined']
+
+
+def http_requests(url, batches):
+    """Latencies (ns) of posting each batch over one keep-alive connection."""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    for texts in batches:
+        if len(texts) == 1:
+            path, body = '/predict', json.dumps({'text': texts[0]})
+        else:
+            path, body = '/predict/batch', json.dumps({'texts': texts})
+        start = time.perf_counter_ns()
+        conn.request('POST', path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter_ns() - start)
+        if response.status != 200:
+            raise RuntimeError(f"{path} answered {response.status}")
+    conn.close()
+    return latencies
+
+
+def socket_requests(path, batches, codec):
+    """Latencies (ns) of sending each batch and waiting for its reply."""
+    latencies = []
+    with SocketClient(path, codec) as client:
+        for texts in batches:
+            start = time.perf_counter_ns()
+            client.predict(texts)
+            latencies.append(time.perf_counter_ns() - start)
+    return latencies
+
+
+def pipelined_requests(path, batches, codec, window):
+    """Latencies (ns) from sending each frame to reading its reply, window frames in flight."""
+    latencies = []
+    sent = []
+    with SocketClient(path, codec) as client:
+        def receive():
+            reply = client.receive()
+            if 'error' in reply:
+                raise RuntimeError(reply['error'])
+            latencies.append(time.perf_counter_ns() - sent[reply['id']])
+
+        for texts in batches:
+            if len(sent) - len(latencies) == window:
+                receive()
+            sent.append(time.perf_counter_ns())
+            client.send(texts)
+        while len(latencies) < len(sent):
+            receive()
+    return latencies
+
+
+def run_mode(mode, url, socket_path, batches, codec, window):
+    start = time.perf_counter()
+    if mode == 'http':
+        latencies = http_requests(url, batches)
+    elif mode == 'socket':
+        latencies = socket_requests(socket_path, batches, codec)
+    else:
+        latencies = pipelined_requests(socket_path, batches, codec, window)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    reviews = sum(len(b) for b in batches)
+    return {
+        'mode': mode,
+        'batch_size': len(batches[0]),
+        'requests': len(batches),
+        'requests_per_s': len(batches) / elapsed,
+        'reviews_per_s': reviews / elapsed,
+        'p50_ms': percentile(latencies, 50) / 1e6,
+        'p99_ms': percentile(latencies, 99) / 1e6,
+    }
+
+
+def run_benchmark(url, socket_path, batch_sizes, requests, words, codec, window):
+    rows = []
+    for b, batch_size in enumerate(batch_sizes):
+        for m, mode in enumerate(MODES):
+            texts = synthetic_reviews(requests * batch_size, words, seed=1000 * b + m + 1)
+            batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            # A few untimed requests first, so connection setup and lazy imports are not measured
+            run_mode(mode, url, socket_path, batches[:5], codec, window)
+            rows.append(run_mode(mode, url, socket_path, batches[5:], codec, window))
+            print(f"batch {batch_size:>4} {mode:>16}: {rows[-1]['reviews_per_s']:.0f} reviews/s")
+    return rows
+
+
+def spawn_server(socket_path, workers):
+    """gunicorn serving both transports; returns (process, url)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    url = f'http://127.0.0.1:{BENCH_PORT}'
+    env = dict(os.environ, SOCKET_PATH=socket_path)
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+               '--workers', str(workers), '--bind', f'127.0.0.1:{BENCH_PORT}']
+    process = subprocess.Popen(command, cwd=here, env=env)
+    try:
+        wait_until_ready(url, process)
+    except RuntimeError:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+        raise
+    return process, url
+
+
+def print_table(rows):
+    http_rates = {row['batch_size']: row['reviews_per_s'] for row in rows if row['mode'] == 'http'}
+    print(f"\n{'batch':>5} {'mode':>16} {'req/s':>9} {'reviews/s':>10} {'vs http':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        ratio = row['reviews_per_s'] / http_rates.get(row['batch_size'], row['reviews_per_s'])
+        print(f"{row['batch_size']:>5} {row['mode']:>16} {row['requests_per_s']:>9.1f} {row['reviews_per_s']:>10.0f} "
+              f"{ratio:>7.2f}x {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare HTTP with the Unix socket transport.")
+    parser.add_argument('--url', help="running HTTP instance (default: start gunicorn)")
+    parser.add_argument('--socket', help="socket of the running instance (required with --url)")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn workers when starting one")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help="requests per mode and batch size")
+    parser.add_argument('--words', type=int, default=DEFAULT_WORDS, help="words per synthetic review")
+    parser.add_argument('--codec', choices=sorted(CODEC_NAMES), help="socket frame codec (default: msgpack if installed)")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help="frames in flight when pipelining")
+    parser.add_argument('--output', help="write results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.url and not args.socket:
+        raise SystemExit("--socket is required with --url")
+    codec = CODEC_NAMES[args.codec] if args.codec else default_codec()
+    process = None
+    socket_path = args.socket
+    url = args.url
+    if url is None:
+        socket_path = os.path.join(tempfile.mkdtemp(), 'review-sentiment.sock')
+        process, url = spawn_server(socket_path, args.workers)
+    try:
+        rows = run_benchmark(url, socket_path, args.batch_sizes, args.requests + 5, args.words, codec, args.window)
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+    print_table(rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=4)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within one process
+    fcntl = None
+
+# Created the first time a store is opened on an empty location
+DEFAULT_USERS = {'admin': {'password': 'password123'}}
+
+
+class UserStore:
+    """
+    Interface for user storage used by the Flask app. Lookups are served
+    from memory; implementations only go to disk when a user is added or
+    an unknown username has to be checked against other workers' writes.
+    """
+
+    def get(self, username):
+        """Returns the user record (a dict) or None."""
+        raise NotImplementedError
+
+    def add(self, username, record):
+        """Adds a user. Returns False if the username is already taken."""
+        raise NotImplementedError
+
+    def __contains__(self, username):
+        return self.get(username) is not None
+
+    def close(self):
+        """Releases open files/connections (called on worker shutdown)."""
+
+
+class JsonUserStore(UserStore):
+    """
+    Users kept in a dict, persisted to a JSON file. Writes go to a temporary
+    file that is renamed over the original, under a lock file, so concurrent
+    registrations cannot lose each other's writes or leave a partial file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._users = {}
+        self._mtime = None
+        with self._write_lock():
+            if not os.path.exists(self.path):
+                self._write(dict(DEFAULT_USERS))
+            self._reload()
+
+    def get(self, username):
+        user = self._users.get(username)
+        if user is None and self._changed_on_disk():
+            # Another worker may have registered this user
+            with self._lock:
+                self._reload()
+            user = self._users.get(username)
+        return user
+
+    def add(self, username, record):
+        with self._write_lock():
+            # Merge with whatever other workers wrote since we last read
+            self._reload()
+            if username in self._users:
+                return False
+            users = dict(self._users)
+            users[username] = record
+            self._write(users)
+            self._reload()
+        return True
+
+    def _changed_on_disk(self):
+        try:
+            return os.stat(self.path).st_mtime_ns != self._mtime
+        except OSError:
+            return False
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r') as f:
+                users = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading users: {e}")
+            return
+        self._users = users
+        self._mtime = mtime
+
+    def _write(self, users):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.users-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(users, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _write_lock(self):
+        """Serializes writers across threads and, where fcntl exists, processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SqliteUserStore(UserStore):
+    """
+    Users in an SQLite table with username as primary key, so the file can
+    be shared by many workers and writes are transactional. Known users are
+    also kept in memory so repeat lookups do not query the database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._users = {}
+        # A connection opened before a pre-fork server forks must not be used by the workers
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_connections)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, record TEXT NOT NULL)")
+        conn.commit()
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+            for username, record in DEFAULT_USERS.items():
+                self.add(username, record)
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def get(self, username):
+        user = self._users.get(username)
+        if user is None:
+            row = self._conn().execute("SELECT record FROM users WHERE username = ?", (username,)).fetchone()
+            if row is not None:
+                user = json.loads(row[0])
+                self._users[username] = user
+        return user
+
+    def add(self, username, record):
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute("INSERT INTO users (username, record) VALUES (?, ?)", (username, json.dumps(record)))
+        except sqlite3.IntegrityError:
+            return False
+        self._users[username] = record
+        return True
+
+
+def create_user_store(backend, path):
+    """Builds the store selected by backend: 'json' or 'sqlite'."""
+    if backend == 'json':
+        return JsonUserStore(path)
+    if backend == 'sqlite':
+        return SqliteUserStore(path)
+    raise ValueError(f"Unknown user store backend: {backend}")
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py
+
+or any other WSGI server pointed at wsgi:application.
+"""
+from app import create_app
+
+# The model watcher is started per worker by gunicorn.conf.py's post_fork hook
+application = create_app(start_watcher=False)